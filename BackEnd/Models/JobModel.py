@@ -1,13 +1,18 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        Index("ix_jobs_profile_id", "profile_id", "id"),
+        Index("ix_jobs_profile_visible", "profile_id", sqlite_where=text("appear = 1"), postgresql_where=text("appear")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     profile_id = Column(String, ForeignKey("profiles.id"), nullable=False)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     appear = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
     profile = relationship("Profile", back_populates="jobs")
\ No newline at end of file
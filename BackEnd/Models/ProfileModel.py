@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -11,8 +11,12 @@ class Profile(Base):
     avatar_url = Column(String, nullable=True)
     email = Column(String, nullable=True)
     phone = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    # Bumped on every write to the profile or its children (see versioning.py) - drives ETags
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
     
-    services = relationship("Service", back_populates="profile", cascade="all, delete-orphan")
-    social_links = relationship("SocialLink", back_populates="profile", cascade="all, delete-orphan")
-    projects = relationship("Project", back_populates="profile", cascade="all, delete-orphan")
-    jobs = relationship("Job", back_populates="profile", cascade="all, delete-orphan")
+    # Same order as the paginated list endpoints
+    services = relationship("Service", back_populates="profile", cascade="all, delete-orphan", order_by="(Service.sort_order, Service.id)")
+    social_links = relationship("SocialLink", back_populates="profile", cascade="all, delete-orphan", order_by="SocialLink.id")
+    projects = relationship("Project", back_populates="profile", cascade="all, delete-orphan", order_by="(Project.sort_order, Project.id)")
+    jobs = relationship("Job", back_populates="profile", cascade="all, delete-orphan", order_by="Job.id")
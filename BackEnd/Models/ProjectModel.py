@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Boolean, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 
 class Project(Base):
     __tablename__ = "projects"
+    __table_args__ = (
+        Index("ix_projects_profile_sort", "profile_id", "sort_order", "id"),
+        Index("ix_projects_profile_sort_visible", "profile_id", "sort_order", sqlite_where=text("appear = 1"), postgresql_where=text("appear")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     profile_id = Column(String, ForeignKey("profiles.id"), nullable=False)
     title = Column(String, nullable=False)
@@ -11,4 +15,5 @@ class Project(Base):
     project_link = Column(String, nullable=True)
     sort_order = Column(Integer, default=0)
     appear = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     profile = relationship("Profile", back_populates="projects")
\ No newline at end of file
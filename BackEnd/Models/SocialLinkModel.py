@@ -1,12 +1,17 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 from database import Base
 
 class SocialLink(Base):
     __tablename__ = "social_links"
+    __table_args__ = (
+        Index("ix_social_links_profile_id", "profile_id", "id"),
+        Index("ix_social_links_profile_visible", "profile_id", sqlite_where=text("appear = 1"), postgresql_where=text("appear")),
+    )
     id = Column(Integer, primary_key=True, index=True)
     profile_id = Column(String, ForeignKey("profiles.id"), nullable=False)
     platform = Column(String, nullable=False)
     url = Column(String, nullable=False)
     appear = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     profile = relationship("Profile", back_populates="social_links")
\ No newline at end of file
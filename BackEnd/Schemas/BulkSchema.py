@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import Generic, List, TypeVar
+
+CreateT = TypeVar("CreateT")
+UpdateT = TypeVar("UpdateT")
+ResponseT = TypeVar("ResponseT")
+
+
+class BulkRequest(BaseModel, Generic[CreateT, UpdateT]):
+    """Creates, updates (with `id`) and deletes (ids) for one entity type, applied in one transaction"""
+    create: List[CreateT] = Field(default_factory=list)
+    update: List[UpdateT] = Field(default_factory=list)
+    delete: List[int] = Field(default_factory=list)
+
+class BulkResponse(BaseModel, Generic[ResponseT]):
+    created: List[ResponseT] = []
+    updated: List[ResponseT] = []
+    deleted: List[int] = []
@@ -9,6 +9,9 @@ class JobsBase(BaseModel):
 class JobsCreate(JobsBase):
     pass
 
+class JobsUpdate(JobsBase):
+    id: int
+
 class JobsResponse(JobsBase):
     id: int
     profile_id: str
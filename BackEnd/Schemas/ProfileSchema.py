@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, create_model
+from typing import Optional, List, Tuple
 from datetime import datetime
 from Schemas.JobSchema import JobsResponse
 from Schemas.ServiceSchema import ServiceResponse
@@ -27,3 +28,18 @@ class ProfileResponse(ProfileBase):
     
     class Config:
         from_attributes = True
+
+# Parts of the public profile a client can ask for (?fields= / ?include=); `id` is always returned
+PROFILE_FIELDS = ("FirstName", "LastName", "avatar_url", "phone", "email", "created_at")
+PROFILE_RELATIONSHIPS = ("jobs", "services", "projects", "social_links")
+
+@lru_cache(maxsize=256)
+def sparse_profile_model(fields: Tuple[str, ...], include: Tuple[str, ...]) -> type[BaseModel]:
+    """ProfileResponse reduced to the given columns and relationships - validation only reads those attributes"""
+    definitions = {"id": (str, ...)}
+    for name in fields + include:
+        field = ProfileResponse.model_fields[name]
+        definitions[name] = (field.annotation, field.default)
+    return create_model(
+        "SparseProfileResponse", __config__=ConfigDict(from_attributes=True), **definitions
+    )
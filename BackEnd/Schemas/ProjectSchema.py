@@ -12,6 +12,9 @@ class ProjectBase(BaseModel):
 class ProjectCreate(ProjectBase):
     pass
 
+class ProjectUpdate(ProjectBase):
+    id: int
+
 class ProjectResponse(ProjectBase):
     id: int
     profile_id: str
@@ -8,6 +8,9 @@ class ServiceBase(BaseModel):
 class ServiceCreate(ServiceBase):
     pass
 
+class ServiceUpdate(ServiceBase):
+    id: int
+
 class ServiceResponse(ServiceBase):
     id: int
     profile_id: str
@@ -8,6 +8,9 @@ class SocialLinkBase(BaseModel):
 class SocialLinkCreate(SocialLinkBase):
     pass
 
+class SocialLinkUpdate(SocialLinkBase):
+    id: int
+
 class SocialLinkResponse(SocialLinkBase):
     id: int
     profile_id: str
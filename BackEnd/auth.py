@@ -1,47 +1,66 @@
 from fastapi import HTTPException, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyCookie
 from jose import jwt, JWTError
-from typing import Optional
-import httpx
-from config import AUTH0_DOMAIN, AUTH0_AUDIENCE, ALGORITHMS
-from database import SessionLocal
+from typing import Optional, Sequence
+from config import (
+    AUTH0_ISSUER, AUTH0_AUDIENCE, ALGORITHMS, TOKEN_CACHE_MAX_SIZE, KNOWN_PROFILES_MAX_SIZE,
+    AUTH0_JWKS_URL, JWKS_CACHE_TTL, JWKS_REFRESH_MARGIN, JWKS_MIN_REFETCH_INTERVAL, JWKS_CACHE_PATH
+)
+from jwks import JWKSManager
+from token_cache import TokenCache
+from profile_cache import profile_cache
+from known_profiles import KnownProfiles
+from database import AsyncSessionLocal
+from logging_config import get_logger
+from metrics import JWT_VERIFY_DURATION, register_callback
+import time
 from Models.ProfileModel import Profile
-from sqlalchemy.orm import Session
+from Schemas.ProfileSchema import PROFILE_RELATIONSHIPS
+from sqlalchemy import select, func, case, and_, or_
+from sqlalchemy.orm import selectinload, load_only
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = get_logger("auth")
 
 # Make security optional for Swagger
 security = HTTPBearer(auto_error=False)  # auto_error=False makes it optional
 cookie_security = APIKeyCookie(name="access_token", auto_error=False)
 
-# Cache for JWKS
-_jwks_cache = None
+# Signing keys - fetched asynchronously and refreshed in the background (started in main.py lifespan)
+jwks_manager = JWKSManager(
+    AUTH0_JWKS_URL,
+    ttl=JWKS_CACHE_TTL,
+    refresh_margin=JWKS_REFRESH_MARGIN,
+    min_refetch_interval=JWKS_MIN_REFETCH_INTERVAL,
+    cache_path=JWKS_CACHE_PATH or None,
+)
+
+# Profiles this worker knows exist - /api/profile/me doesn't provision them again
+known_profiles = KnownProfiles(max_size=KNOWN_PROFILES_MAX_SIZE)
 
-def get_jwks():
-    global _jwks_cache
-    if _jwks_cache is None:
-        url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        response = httpx.get(url)
-        _jwks_cache = response.json()
-    return _jwks_cache
+# Cache of already verified tokens - skips RSA verification for repeat requests
+token_cache = TokenCache(max_size=TOKEN_CACHE_MAX_SIZE)
+register_callback(
+    "token_cache_lookups_total", "Verified-token cache lookups",
+    lambda: [(("hit",), token_cache.hits), (("miss",), token_cache.misses)], ("result",), kind="counter"
+)
 
 def get_token_from_request(request: Request) -> Optional[str]:
     """Get token from HTTP-only cookie first, then from Authorization header as fallback"""
-    # Debug: Print all cookies
-    print(f"All cookies received: {request.cookies}")
-    print(f"Cookie 'access_token': {request.cookies.get('access_token')}")
-    
     # Priority 1: HTTP-only cookie (most secure)
     token = request.cookies.get("access_token")
     if token:
-        print("Token found in cookie!")
+        logger.debug("Token found in cookie")
         return token
     
     # Priority 2: Authorization header (fallback for API clients)
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Bearer "):
-        print("Token found in Authorization header")
+        logger.debug("Token found in Authorization header")
         return auth_header.split(" ")[1]
     
-    print("No token found!")
+    # Cookie names only - values are credentials
+    logger.debug("No token found (cookies received: %s)", list(request.cookies))
     return None
 
 async def verify_token(request: Request = None, credentials: HTTPAuthorizationCredentials = None):
@@ -61,20 +80,17 @@ async def verify_token(request: Request = None, credentials: HTTPAuthorizationCr
     if len(token_parts) != 3:
         raise HTTPException(status_code=401, detail=f"Invalid token format. Expected 3 parts, got {len(token_parts)}")
     
+    start = time.perf_counter()
+    cached_payload = token_cache.get(token)
+    if cached_payload is not None:
+        JWT_VERIFY_DURATION.observe(time.perf_counter() - start, "cache_hit")
+        return cached_payload
+    
+    outcome = "failed"
     try:
-        jwks = get_jwks()
         unverified_header = jwt.get_unverified_header(token)
-        rsa_key = {}
-        for key in jwks["keys"]:
-            if key["kid"] == unverified_header["kid"]:
-                rsa_key = {
-                    "kty": key["kty"],
-                    "kid": key["kid"],
-                    "use": key["use"],
-                    "n": key["n"],
-                    "e": key["e"]
-                }
-        if not rsa_key:
+        rsa_key = await jwks_manager.get_signing_key(unverified_header.get("kid"))
+        if rsa_key is None:
             raise HTTPException(status_code=401, detail="Unable to find appropriate key")
         
         payload = jwt.decode(
@@ -82,14 +98,18 @@ async def verify_token(request: Request = None, credentials: HTTPAuthorizationCr
             rsa_key,
             algorithms=ALGORITHMS,
             audience=AUTH0_AUDIENCE,
-            issuer=f"https://{AUTH0_DOMAIN}/"
+            issuer=AUTH0_ISSUER
         )
+        token_cache.set(token, payload)
+        outcome = "verified"
         return payload
     except JWTError as e:
         # JWTError catches all JWT-related errors including decode errors
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=401, detail=f"Token verification error: {str(e)}")
+    finally:
+        JWT_VERIFY_DURATION.observe(time.perf_counter() - start, outcome)
 
 # Update the get_token_data function to work better with Swagger
 async def get_token_data(
@@ -123,112 +143,119 @@ def get_user_id_from_token(token_data: dict) -> str:
 
 def get_user_email_from_token(token_data: dict) -> str:
     """Extract user email from Auth0 token"""
-    email = token_data.get("email", "")
-    print(f"🔍 Extracting email: '{email}'")
-    return email
+    return token_data.get("email", "")
 
 def get_user_name_from_token(token_data: dict) -> tuple[str, str]:
     """Extract user name from Auth0 token/userinfo and split into first/last"""
-    # Debug: Print what we're receiving
-    print(f"🔍 Extracting name from token_data keys: {list(token_data.keys())}")
-    
     # Try given_name and family_name first (from /userinfo endpoint)
     given_name = token_data.get("given_name", "")
     family_name = token_data.get("family_name", "")
     
-    print(f"   given_name: '{given_name}', family_name: '{family_name}'")
-    
     if given_name or family_name:
-        result = (given_name or "", family_name or "")
-        print(f"   ✅ Using given_name/family_name: {result}")
-        return result
+        return (given_name or "", family_name or "")
     
     # Fallback to name field
     name = token_data.get("name", "")
-    print(f"   name field: '{name}'")
-    
     if name:
         parts = name.split(" ", 1)
-        result = (parts[0], parts[1] if len(parts) > 1 else "")
-        print(f"   ✅ Using name field (split): {result}")
-        return result
+        return (parts[0], parts[1] if len(parts) > 1 else "")
     
-    print(f"   ⚠️ No name found in token data")
+    logger.debug("No name found in token data (keys: %s)", list(token_data))
     return ("", "")
 
-def get_or_create_profile(token_data: dict, db: Session) -> Profile:
-    """Automatically create profile if it doesn't exist, using Auth0 token/userinfo data"""
-    user_id = get_user_id_from_token(token_data)
+async def load_profile_with_children(
+    db: AsyncSession,
+    profile_id: str,
+    relationships: Sequence[str] = PROFILE_RELATIONSHIPS,
+    columns: Optional[Sequence[str]] = None
+) -> Optional[Profile]:
+    """Load a profile with its child collections (all by default), so serializing it needs no lazy loads.
+
+    `columns` limits the profile columns fetched (the primary key is always loaded).
+    """
+    options = [selectinload(getattr(Profile, name)) for name in relationships]
+    if columns is not None:
+        options.append(load_only(Profile.id, *(getattr(Profile, name) for name in columns)))
+    result = await db.execute(
+        select(Profile)
+        .options(*options)
+        .where(Profile.id == profile_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalar_one_or_none()
+
+def _upsert_statement(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Profile)
+
+async def provision_profile(token_data: dict) -> None:
+    """Create the token's profile, or fill the email / name it is missing - one atomic upsert.
     
+    Concurrent first logins can't insert duplicates, and a profile that already has its
+    data is left untouched (no write, no version bump).
+    """
+    user_id = get_user_id_from_token(token_data)
     if not user_id:
         raise ValueError("User ID (sub) not found in token/userinfo data")
     
-    print(f"\n🔍 Looking for profile with user_id: {user_id}")
-    profile = db.query(Profile).filter(Profile.id == user_id).first()
+    email = get_user_email_from_token(token_data) or None
+    first_name, last_name = get_user_name_from_token(token_data)
     
-    if not profile:
-        # Extract data BEFORE creating profile
-        email = get_user_email_from_token(token_data)
-        first_name, last_name = get_user_name_from_token(token_data)
-        
-        print(f"\n📝 CREATING NEW PROFILE:")
-        print(f"   User ID: {user_id}")
-        print(f"   Email: '{email}'")
-        print(f"   First Name: '{first_name}'")
-        print(f"   Last Name: '{last_name}'")
-        
-        # Verify we have the data
-        if not email:
-            print(f"   ⚠️ WARNING: Email is empty!")
-        if not first_name and not last_name:
-            print(f"   ⚠️ WARNING: Both first and last name are empty!")
-        
-        profile = Profile(
-            id=user_id,
-            email=email if email else None,  # Use None if empty string
-            FirstName=first_name,
-            LastName=last_name,
-            avatar_url=None,
-            phone=None
+    async with AsyncSessionLocal() as db:
+        stmt = _upsert_statement(db.bind.dialect.name).values(
+            id=user_id, email=email, FirstName=first_name, LastName=last_name, avatar_url=None, phone=None
         )
-        
-        print(f"   Profile object created:")
-        print(f"     - id: {profile.id}")
-        print(f"     - email: {profile.email}")
-        print(f"     - FirstName: '{profile.FirstName}'")
-        print(f"     - LastName: '{profile.LastName}'")
-        
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
-        
-        print(f"\n✅ Profile saved to database:")
-        print(f"   ID: {profile.id}")
-        print(f"   Email: {profile.email}")
-        print(f"   FirstName: '{profile.FirstName}'")
-        print(f"   LastName: '{profile.LastName}'")
-    else:
-        print(f"✅ Profile already exists for user: {user_id}")
-        print(f"   Current - Email: {profile.email}, Name: {profile.FirstName} {profile.LastName}")
-        
-        # If profile exists but is empty, update it
-        if not profile.email or (not profile.FirstName and not profile.LastName):
-            print(f"   ⚠️ Profile exists but is missing data. Updating...")
-            email = get_user_email_from_token(token_data)
-            first_name, last_name = get_user_name_from_token(token_data)
-            
-            if email:
-                profile.email = email
-            if first_name:
-                profile.FirstName = first_name
-            if last_name:
-                profile.LastName = last_name
-            
-            db.commit()
-            db.refresh(profile)
-            print(f"   ✅ Profile updated:")
-            print(f"     - Email: {profile.email}")
-            print(f"     - FirstName: '{profile.FirstName}'")
-            print(f"     - LastName: '{profile.LastName}'")
+        excluded = stmt.excluded
+        missing_email = func.coalesce(Profile.email, "") == ""
+        missing_name = and_(func.coalesce(Profile.FirstName, "") == "", func.coalesce(Profile.LastName, "") == "")
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Profile.id],
+            set_={
+                "email": case((missing_email, excluded.email), else_=Profile.email),
+                "FirstName": case((missing_name, excluded.FirstName), else_=Profile.FirstName),
+                "LastName": case((missing_name, excluded.LastName), else_=Profile.LastName),
+                "version": Profile.version + 1,
+                "updated_at": func.now(),
+            },
+            where=or_(
+                and_(missing_email, func.coalesce(excluded.email, "") != ""),
+                and_(missing_name, or_(func.coalesce(excluded.FirstName, "") != "",
+                                       func.coalesce(excluded.LastName, "") != "")),
+            ),
+        ).returning(Profile.version)
+        version = (await db.execute(stmt)).scalar()
+        await db.commit()
+    
+    if version is not None:
+        profile_cache.invalidate(user_id)
+        if version == 1:
+            if not email:
+                logger.warning("Created profile %s without an email", user_id)
+            if not first_name and not last_name:
+                logger.warning("Created profile %s without a first or last name", user_id)
+            logger.info("Created profile %s", user_id)
+        else:
+            logger.info("Filled missing data of profile %s", user_id)
+    known_profiles.add(user_id)
+
+async def get_or_create_profile(token_data: dict, db: AsyncSession) -> Profile:
+    """The token user's profile with all related data, provisioned first unless this worker knows it exists.
+    
+    Only the provisioning writes (in its own session), so `db` may be a read-only session.
+    """
+    user_id = get_user_id_from_token(token_data)
+    if not user_id:
+        raise ValueError("User ID (sub) not found in token/userinfo data")
     
+    if user_id not in known_profiles:
+        await provision_profile(token_data)
+    profile = await load_profile_with_children(db, user_id)
+    if profile is None:
+        # Deleted since this worker last saw it - /me recreates it, as before
+        known_profiles.discard(user_id)
+        await provision_profile(token_data)
+        profile = await load_profile_with_children(db, user_id)
     return profile
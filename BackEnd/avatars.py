@@ -0,0 +1,240 @@
+"""Avatar processing: validation, metadata stripping and resized variants.
+
+An upload is identified by the SHA-256 of its bytes. Each size in AVATAR_SIZES
+is written as WebP plus a fallback (PNG for images with transparency, JPEG
+otherwise) named `<hash>-<size>.<ext>`, so identical uploads share storage and
+re-uploading a known image skips processing entirely.
+
+Shared files are deleted by `release_avatar` once no profile refers to them. An
+upload that reused them may commit in between, so the release moves the files
+aside and counts again before deleting (restoring them if a reference appeared),
+and the upload re-checks its files after committing (`ensure_variants`).
+
+Decoding and resizing are CPU bound, so they run in a process pool instead of
+competing with request handling for the event loop (and the GIL). Workers are
+started from a clean forkserver (spawn where that is unavailable), never forked
+from the threaded server process.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageOps
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from config import AVATAR_SIZES, AVATAR_DEFAULT_SIZE, AVATAR_PROCESS_WORKERS, AVATAR_MAX_PIXELS
+from logging_config import get_logger
+from Models.ProfileModel import Profile
+
+logger = get_logger("avatars")
+
+AVATAR_DIR = Path("uploads/avatars").resolve()
+
+# Leading bytes of the accepted formats - the file extension is only a hint
+MAGIC_NUMBERS = {
+    b"\xff\xd8\xff": "JPEG",
+    b"\x89PNG\r\n\x1a\n": "PNG",
+    b"GIF87a": "GIF",
+    b"GIF89a": "GIF",
+}
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+class ProcessedAvatar(NamedTuple):
+    content_hash: str
+    fallback_ext: str  # "png" or "jpg"
+
+    def filename(self, size: int = AVATAR_DEFAULT_SIZE, ext: str = "webp") -> str:
+        return f"{self.content_hash}-{size}.{ext}"
+
+
+def detect_format(head: bytes) -> Optional[str]:
+    for magic, image_format in MAGIC_NUMBERS.items():
+        if head.startswith(magic):
+            return image_format
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+
+def _has_variants(directory: Path, avatar: ProcessedAvatar) -> bool:
+    return all((directory / avatar.filename(size, ext)).exists()
+               for size in AVATAR_SIZES for ext in ("webp", avatar.fallback_ext))
+
+
+def _existing_variant(directory: Path, content_hash: str) -> Optional[ProcessedAvatar]:
+    """A previous upload of the same bytes - its variants can be reused as they are"""
+    for fallback_ext in ("jpg", "png"):
+        avatar = ProcessedAvatar(content_hash, fallback_ext)
+        if _has_variants(directory, avatar):
+            return avatar
+    return None
+
+
+def _save_atomically(image: Image.Image, path: Path, **params) -> None:
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    image.save(tmp_path, **params)
+    os.replace(tmp_path, path)
+
+
+def process_avatar(source: str, output_dir: str) -> ProcessedAvatar:
+    """Validate `source` and write its variants to `output_dir`. Runs in a worker process."""
+    directory = Path(output_dir)
+    with open(source, "rb") as f:
+        if detect_format(f.read(16)) is None:
+            raise InvalidAvatar("File is not a JPEG, PNG, GIF or WebP image")
+
+    content_hash = _hash_file(source)
+    existing = _existing_variant(directory, content_hash)
+    if existing is not None:
+        return existing
+
+    Image.MAX_IMAGE_PIXELS = AVATAR_MAX_PIXELS
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(source) as opened:
+                # First frame of animations; apply the EXIF rotation before EXIF is dropped
+                image = ImageOps.exif_transpose(opened)
+                image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise InvalidAvatar(f"Unreadable image: {e}")
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    image = image.convert("RGBA" if has_alpha else "RGB")
+    fallback_ext = "png" if has_alpha else "jpg"
+
+    # New images carry no EXIF/ICC/XMP - nothing of the original's metadata is written
+    square = ImageOps.fit(image, (max(AVATAR_SIZES),) * 2, method=Image.Resampling.LANCZOS)
+    avatar = ProcessedAvatar(content_hash, fallback_ext)
+    for size in AVATAR_SIZES:
+        variant = square.resize((size, size), Image.Resampling.LANCZOS) if size != square.width else square
+        _save_atomically(variant, directory / avatar.filename(size, "webp"), format="WEBP", quality=WEBP_QUALITY, method=4)
+        if has_alpha:
+            _save_atomically(variant, directory / avatar.filename(size, "png"), format="PNG", optimize=True)
+        else:
+            _save_atomically(variant, directory / avatar.filename(size, "jpg"), format="JPEG",
+                             quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return avatar
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # fork would copy locks held by the logging, threadpool and rate limit threads
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _pool = ProcessPoolExecutor(max_workers=AVATAR_PROCESS_WORKERS, mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def start_pool() -> None:
+    """Create the worker pool up front (app startup) rather than on the first upload"""
+    _get_pool()
+
+
+async def process_upload(source: Path, output_dir: Path) -> ProcessedAvatar:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pool(), process_avatar, str(source), str(output_dir))
+
+
+async def ensure_variants(source: Path, output_dir: Path, avatar: ProcessedAvatar) -> None:
+    """Rebuild `avatar`'s files from `source` if a concurrent release removed them.
+
+    Call after the profile row referring to `avatar` was committed.
+    """
+    if not await run_in_threadpool(_has_variants, output_dir, avatar):
+        logger.debug("Avatar %s was released concurrently, regenerating", avatar.content_hash)
+        await process_upload(source, output_dir)
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)  # queued work is dropped; workers exit cleanly
+        _pool = None
+
+
+def content_hash_of(avatar_url: Optional[str]) -> Optional[str]:
+    """Content hash of a processed avatar URL (`.../<hash>-<size>.<ext>`), None for other URLs"""
+    if not avatar_url:
+        return None
+    stem = avatar_url.rsplit("/", 1)[-1].split(".", 1)[0]
+    content_hash, _, size = stem.rpartition("-")
+    if len(content_hash) == 32 and size.isdigit():
+        return content_hash
+    return None
+
+
+async def release_avatar(db: AsyncSession, avatar_url: Optional[str], directory: Path) -> None:
+    """Delete an avatar's files once no profile refers to them any more.
+
+    Call after the referencing profile row was changed or deleted and committed.
+    """
+    if not avatar_url or "uploads/avatars/" not in avatar_url:
+        return
+    content_hash = content_hash_of(avatar_url)
+    if content_hash is None:
+        # Stored as uploaded, before processing existed - one file per profile
+        await run_in_threadpool((directory / Path(avatar_url).name).unlink, True)
+        return
+
+    if await _reference_count(db, content_hash):
+        return
+    # Move the files aside and count again: an upload of the same image may have reused them
+    # and committed in the meantime. Uploads re-check their files after committing, so only a
+    # commit between the two counts needs the files put back.
+    released = await run_in_threadpool(_move_aside, directory, content_hash)
+    if await _reference_count(db, content_hash):
+        await run_in_threadpool(_restore, released)
+        return
+    for _, aside in released:
+        await run_in_threadpool(aside.unlink, True)
+    logger.debug("Released avatar %s (%d files)", content_hash, len(released))
+
+
+async def _reference_count(db: AsyncSession, content_hash: str) -> int:
+    await db.rollback()  # a fresh transaction, so commits by other sessions are visible
+    result = await db.execute(
+        select(func.count()).select_from(Profile).where(Profile.avatar_url.contains(content_hash))
+    )
+    return result.scalar()
+
+
+def _move_aside(directory: Path, content_hash: str) -> List[Tuple[Path, Path]]:
+    released = []
+    for path in directory.glob(f"{content_hash}-*"):
+        aside = path.with_name(f".{path.name}.{os.getpid()}.released")
+        try:
+            os.replace(path, aside)
+        except FileNotFoundError:  # released by another worker
+            continue
+        released.append((path, aside))
+    return released
+
+
+def _restore(released: List[Tuple[Path, Path]]) -> None:
+    for path, aside in released:
+        os.replace(aside, path)
@@ -0,0 +1,175 @@
+"""Local stand-in for the Auth0 endpoints the API talks to.
+
+Generates an RSA key pair at startup, serves its public half as a JWKS and
+signs RS256 access tokens with the private half, so protected routes can be
+exercised without a real tenant. Point the API at it with:
+
+    AUTH0_BASE_URL=http://127.0.0.1:<port>
+
+Endpoints:
+    GET  /.well-known/jwks.json
+    POST /oauth/token   (authorization_code: `code` is used as the user id;
+                         refresh_token: the refresh token is "refresh:<user id>")
+    GET  /userinfo
+
+Run standalone (prints a token for a test user):
+    python benchmarks/fake_auth0.py --port 8765 --sub "bench|1"
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+class FakeAuth0:
+    """Signing key, token minting and the HTTP server, bound to one audience"""
+
+    def __init__(self, audience: str, host: str = "127.0.0.1", port: int = 0,
+                 kid: str = "bench-key", token_ttl: int = 3600):
+        self.audience = audience
+        self.kid = kid
+        self.token_ttl = token_ttl
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._private_pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        numbers = private_key.public_key().public_numbers()
+        self.jwks = {"keys": [{
+            "kty": "RSA", "use": "sig", "alg": "RS256", "kid": kid,
+            "n": _b64url_uint(numbers.n), "e": _b64url_uint(numbers.e),
+        }]}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def issuer(self) -> str:
+        return f"{self.base_url}/"
+
+    def issue_token(self, sub: str, email: Optional[str] = None, name: Optional[str] = None,
+                    ttl: Optional[int] = None) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer, "aud": self.audience, "sub": sub,
+            "iat": now, "exp": now + (ttl or self.token_ttl),
+        }
+        if email:
+            claims["email"] = email
+        if name:
+            claims["name"] = name
+        return jwt.encode(claims, self._private_pem, algorithm="RS256", headers={"kid": self.kid})
+
+    def claims(self, token: str) -> dict:
+        return jwt.decode(token, self.jwks["keys"][0], algorithms=["RS256"],
+                          audience=self.audience, issuer=self.issuer)
+
+    def start(self) -> "FakeAuth0":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-auth0", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _token_response(self, sub: str) -> dict:
+        return {
+            "access_token": self.issue_token(sub),
+            "refresh_token": f"refresh:{sub}",
+            "token_type": "Bearer",
+            "expires_in": self.token_ttl,
+        }
+
+    def _handler_class(self):
+        auth0 = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real tenant
+
+            def log_message(self, format, *args):
+                pass  # keep benchmark output readable
+
+            def _send_json(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == "/.well-known/jwks.json":
+                    self._send_json(200, auth0.jwks)
+                elif path == "/userinfo":
+                    header = self.headers.get("Authorization", "")
+                    try:
+                        claims = auth0.claims(header.removeprefix("Bearer "))
+                    except Exception:
+                        self._send_json(401, {"error": "invalid_token"})
+                        return
+                    self._send_json(200, {key: value for key, value in claims.items()
+                                          if key in ("sub", "email", "name")})
+                else:
+                    self._send_json(404, {"error": "not_found"})
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/oauth/token":
+                    self._send_json(404, {"error": "not_found"})
+                    return
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    body = json.loads(raw or "{}")
+                else:
+                    body = {key: values[0] for key, values in parse_qs(raw).items()}
+
+                grant_type = body.get("grant_type")
+                if grant_type == "authorization_code" and body.get("code"):
+                    self._send_json(200, auth0._token_response(body["code"]))
+                elif grant_type == "refresh_token" and str(body.get("refresh_token", "")).startswith("refresh:"):
+                    self._send_json(200, auth0._token_response(body["refresh_token"][len("refresh:"):]))
+                else:
+                    self._send_json(403, {"error": "invalid_grant", "error_description": "Unknown grant"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--audience", default="benchmark", help="must match the API's AUTH0_AUDIENCE")
+    parser.add_argument("--sub", default="bench|0", help="user id of the printed token")
+    args = parser.parse_args()
+
+    auth0 = FakeAuth0(args.audience, host=args.host, port=args.port).start()
+    print(f"AUTH0_BASE_URL={auth0.base_url}")
+    print(f"Token for {args.sub}: {auth0.issue_token(args.sub)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        auth0.stop()
+
+
+if __name__ == "__main__":
+    main()
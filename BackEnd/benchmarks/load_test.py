@@ -0,0 +1,313 @@
+"""HTTP load test of the API against a local Auth0 stand-in and seeded data.
+
+Starts the fake Auth0 server (benchmarks/fake_auth0.py), seeds a throwaway
+SQLite database (benchmarks/seed_data.py), launches the API under uvicorn
+pointed at both, then runs each scenario with a fixed number of concurrent
+virtual users (closed loop: every user sends its next request as soon as the
+previous one completes).
+
+Scenarios:
+    public_profile  GET /api/profile/{id}, skewed towards a hot set of profiles
+    profile_me      GET /api/profile/me, one token per virtual user
+    crud_mix        authenticated reads and project/job/service writes
+
+Reports p50/p95/p99 latency and throughput per scenario and per operation.
+Save a run with --json and compare a later commit against it with --compare.
+
+Run from the BackEnd directory:
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --scenarios public_profile --concurrency 64 --duration 30 --workers 4
+    python benchmarks/load_test.py --json before.json
+    python benchmarks/load_test.py --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_auth0 import FakeAuth0  # noqa: E402
+from seed_data import PROFILE_PREFIX  # noqa: E402
+
+AUDIENCE = "benchmark"
+HOT_SHARE = 0.8  # share of public reads that go to the hot 10% of profiles
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+# ========== RECORDING ==========
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def request(self, client: httpx.AsyncClient, operation: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - start
+        if self.recording:
+            self.latencies[operation].append(elapsed)
+            if response is None or response.status_code >= 400:
+                self.errors[operation] += 1
+        return response
+
+    def summary(self, duration: float) -> dict:
+        operations = {}
+        for operation, values in sorted(self.latencies.items()):
+            operations[operation] = _stats(values, self.errors[operation], duration)
+        all_values = [value for values in self.latencies.values() for value in values]
+        return {"total": _stats(all_values, sum(self.errors.values()), duration), "operations": operations}
+
+
+def _stats(values: List[float], errors: int, duration: float) -> dict:
+    values = sorted(values)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput": len(values) / duration if duration else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": (values[-1] * 1000) if values else 0.0,
+    }
+
+
+# ========== SCENARIOS ==========
+
+class VirtualUser:
+    def __init__(self, index: int, profiles: int, auth0: FakeAuth0):
+        self.rng = random.Random(index)
+        self.profile_id = f"{PROFILE_PREFIX}{index % profiles}"
+        self.headers = {"Authorization": f"Bearer {auth0.issue_token(self.profile_id)}"}
+        self.created: Dict[str, List[int]] = defaultdict(list)
+
+
+def _public_profile_id(user: VirtualUser, profiles: int) -> str:
+    hot = max(1, profiles // 10)
+    if user.rng.random() < HOT_SHARE:
+        return f"{PROFILE_PREFIX}{user.rng.randrange(hot)}"
+    return f"{PROFILE_PREFIX}{user.rng.randrange(profiles)}"
+
+
+async def public_profile(client, recorder: Recorder, user: VirtualUser, profiles: int):
+    await recorder.request(client, "GET /api/profile/{id}", "GET", f"/api/profile/{_public_profile_id(user, profiles)}")
+
+
+async def profile_me(client, recorder: Recorder, user: VirtualUser, profiles: int):
+    await recorder.request(client, "GET /api/profile/me", "GET", "/api/profile/me", headers=user.headers)
+
+
+CRUD_RESOURCES = {
+    "projects": lambda rng: {"title": "Load test project", "description": "x" * rng.randint(20, 400),
+                             "project_link": "https://example.com", "sort_order": rng.randint(0, 20)},
+    "jobs": lambda rng: {"title": "Load test job", "description": "x" * rng.randint(20, 200)},
+    "services": lambda rng: {"title": "Load test service", "description": "x" * rng.randint(20, 200),
+                             "sort_order": rng.randint(0, 20)},
+}
+
+
+async def crud_mix(client, recorder: Recorder, user: VirtualUser, profiles: int):
+    """~60% reads, ~20% creates, ~10% updates, ~10% deletes; each user only touches rows it created"""
+    rng = user.rng
+    resource = rng.choice(list(CRUD_RESOURCES))
+    created = user.created[resource]
+    roll = rng.random()
+
+    if roll < 0.3:
+        await recorder.request(client, "GET /api/profile/me", "GET", "/api/profile/me", headers=user.headers)
+    elif roll < 0.6:
+        await recorder.request(client, f"GET /api/{resource}", "GET", f"/api/{resource}",
+                               params={"profile_id": _public_profile_id(user, profiles)}, headers=user.headers)
+    elif roll < 0.8 or not created:
+        response = await recorder.request(client, f"POST /api/{resource}", "POST", f"/api/{resource}",
+                                          json=CRUD_RESOURCES[resource](rng), headers=user.headers)
+        if response is not None and response.status_code == 200:
+            created.append(response.json()["id"])
+    elif roll < 0.9:
+        await recorder.request(client, f"PUT /api/{resource}/{{id}}", "PUT", f"/api/{resource}/{rng.choice(created)}",
+                               json=CRUD_RESOURCES[resource](rng), headers=user.headers)
+    else:
+        item_id = created.pop(rng.randrange(len(created)))
+        await recorder.request(client, f"DELETE /api/{resource}/{{id}}", "DELETE", f"/api/{resource}/{item_id}",
+                               headers=user.headers)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "public_profile": public_profile,
+    "profile_me": profile_me,
+    "crud_mix": crud_mix,
+}
+
+
+async def run_scenario(base_url: str, auth0: FakeAuth0, scenario: Callable, profiles: int,
+                       concurrency: int, duration: float, warmup: float) -> dict:
+    recorder = Recorder()
+    users = [VirtualUser(i, profiles, auth0) for i in range(concurrency)]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    stop_at = time.perf_counter() + warmup + duration
+
+    async def user_loop(client: httpx.AsyncClient, user: VirtualUser):
+        while time.perf_counter() < stop_at:
+            await scenario(client, recorder, user, profiles)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        tasks = [asyncio.create_task(user_loop(client, user)) for user in users]
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*tasks)
+        measured = time.perf_counter() - started
+    return recorder.summary(measured)
+
+
+# ========== ENVIRONMENT ==========
+
+def seed_database(database_url: str, profiles: int) -> None:
+    subprocess.run(
+        [sys.executable, str(BACKEND_DIR / "benchmarks" / "seed_data.py"),
+         "--profiles", str(profiles), "--database", database_url, "--reset"],
+        cwd=BACKEND_DIR, check=True
+    )
+
+
+def start_api(port: int, workers: int, database_url: str, auth0: FakeAuth0, extra_env: Dict[str, str]) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "AUTH0_DOMAIN": "benchmark.local",
+        "AUTH0_AUDIENCE": AUDIENCE,
+        "AUTH0_CLIENT_ID": "benchmark",
+        "AUTH0_CLIENT_SECRET": "benchmark",
+        "AUTH0_BASE_URL": auth0.base_url,
+        "DATABASE_URL": database_url,
+        "JWKS_CACHE_PATH": "",
+        "PROFILE_CACHE_STATS_PATH": "",
+        "LOG_LEVEL": "WARNING",
+        "RATE_LIMIT_ENABLED": "false",  # measuring the API, not the limiter
+        **extra_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited during startup (code {process.returncode})")
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("API did not become ready in time")
+
+
+# ========== REPORTING ==========
+
+def print_report(name: str, result: dict, baseline: Optional[dict]) -> None:
+    print(f"\n{name}")
+    print(f"  {'operation':<28} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = [("total", result["total"])] + list(result["operations"].items())
+    for operation, stats in rows:
+        line = (f"  {operation:<28} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput']:>9.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+        base = (baseline or {}).get(name, {})
+        base = base.get("total") if operation == "total" else base.get("operations", {}).get(operation)
+        if base:
+            line += (f"   vs baseline: req/s {_delta(stats['throughput'], base['throughput'])}, "
+                     f"p95 {_delta(stats['p95_ms'], base['p95_ms'])}")
+        print(line)
+
+
+def _delta(current: float, previous: float) -> str:
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--profiles", type=int, default=1000, help="seeded profiles")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=15, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before each scenario")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--database", help="use this (already seeded) SQLite file instead of a fresh one")
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="extra settings for the API process, e.g. DB_READ_ONLY_CONNECTIONS=false")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.compare).read_text())["results"] if args.compare else None
+    extra_env = dict(item.split("=", 1) for item in args.env)
+
+    auth0 = FakeAuth0(AUDIENCE).start()
+    tmp_dir = tempfile.mkdtemp(prefix="bioconnect-load-")
+    if args.database:
+        database_url = f"sqlite:///{Path(args.database).resolve()}"
+    else:
+        database_url = f"sqlite:///{tmp_dir}/load.db"
+        seed_database(database_url, args.profiles)
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    api = start_api(port, args.workers, database_url, auth0, extra_env)
+    results = {}
+    try:
+        wait_until_ready(base_url, api)
+        for name in args.scenarios:
+            results[name] = asyncio.run(run_scenario(
+                base_url, auth0, SCENARIOS[name], args.profiles, args.concurrency, args.duration, args.warmup
+            ))
+            print_report(name, results[name], baseline)
+    finally:
+        api.terminate()
+        api.wait(timeout=10)
+        auth0.stop()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "settings": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+            "results": results,
+        }, indent=2))
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
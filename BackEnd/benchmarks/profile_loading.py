@@ -0,0 +1,126 @@
+"""Benchmark: loading a full profile with joinedload vs selectinload.
+
+Seeds a throwaway SQLite database with one profile per collection size and
+reports, for each loading strategy, how many rows SQLite returns and how long
+the load takes. joinedload returns the cartesian product of the four
+collections (size^4 rows), so its runs are skipped above --max-rows.
+
+Run from the BackEnd directory:
+    python benchmarks/profile_loading.py
+    python benchmarks/profile_loading.py --sizes 5 10 20 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# The app modules read Auth0 settings at import time - a benchmark doesn't need real ones
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+for name in ("AUTH0_DOMAIN", "AUTH0_AUDIENCE", "AUTH0_CLIENT_ID", "AUTH0_CLIENT_SECRET"):
+    os.environ.setdefault(name, "benchmark")
+_tmp_dir = tempfile.mkdtemp(prefix="bioconnect-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/bench.db"
+os.environ.setdefault("JWKS_CACHE_PATH", "")
+
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.orm import joinedload, selectinload  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from Models.ProfileModel import Profile  # noqa: E402
+from Models.JobModel import Job  # noqa: E402
+from Models.ServiceModel import Service  # noqa: E402
+from Models.ProjectModel import Project  # noqa: E402
+from Models.SocialLinkModel import SocialLink  # noqa: E402
+
+RELATIONSHIPS = (Profile.jobs, Profile.services, Profile.projects, Profile.social_links)
+
+# Rows one load returns, by strategy and children per collection
+EXPECTED_ROWS = {
+    "joinedload": lambda size: max(size, 1) ** len(RELATIONSHIPS),
+    "selectinload": lambda size: 1 + size * len(RELATIONSHIPS),
+}
+
+STRATEGIES = {
+    "joinedload": lambda: [joinedload(rel) for rel in RELATIONSHIPS],
+    "selectinload": lambda: [selectinload(rel) for rel in RELATIONSHIPS],
+}
+
+
+def seed(sizes):
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        for size in sizes:
+            profile_id = f"bench|{size}"
+            db.add(Profile(id=profile_id, FirstName="Bench", LastName=str(size)))
+            for i in range(size):
+                db.add(Job(profile_id=profile_id, title=f"Job {i}", description="x" * 200))
+                db.add(Service(profile_id=profile_id, title=f"Service {i}", description="x" * 200, sort_order=i))
+                db.add(Project(profile_id=profile_id, title=f"Project {i}", description="x" * 200, sort_order=i))
+                db.add(SocialLink(profile_id=profile_id, platform=f"site{i}", url=f"https://example.com/{i}"))
+        db.commit()
+
+
+def load(strategy, profile_id):
+    with SessionLocal() as db:
+        result = db.execute(select(Profile).options(*STRATEGIES[strategy]()).where(Profile.id == profile_id))
+        profile = result.unique().scalar_one()
+        return sum(len(getattr(profile, rel.key)) for rel in RELATIONSHIPS)
+
+
+def count_rows(strategy, profile_id):
+    """Capture the statements a load issues, then replay them to count the rows SQLite returns"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        load(strategy, profile_id)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    rows = 0
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            rows += len(conn.exec_driver_sql(statement, parameters).fetchall())
+    return len(statements), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10],
+                        help="children per collection (each profile has this many jobs, services, projects and links)")
+    parser.add_argument("--repeat", type=int, default=10, help="timed loads per strategy and size")
+    parser.add_argument("--max-rows", type=int, default=20000,
+                        help="skip a strategy at sizes where a single load would return more rows than this")
+    args = parser.parse_args()
+
+    seed(args.sizes)
+
+    print(f"{'children':>9} {'strategy':>13} {'queries':>8} {'rows':>10} {'median ms':>10} {'p95 ms':>9}")
+    for size in args.sizes:
+        profile_id = f"bench|{size}"
+        for strategy in STRATEGIES:
+            if EXPECTED_ROWS[strategy](size) > args.max_rows:
+                print(f"{size * 4:>9} {strategy:>13} {'-':>8} {EXPECTED_ROWS[strategy](size):>10} {'skipped (--max-rows)':>20}")
+                continue
+            queries, rows = count_rows(strategy, profile_id)
+            load(strategy, profile_id)  # warm up
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                children = load(strategy, profile_id)
+                timings.append((time.perf_counter() - start) * 1000)
+            assert children == size * 4
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{size * 4:>9} {strategy:>13} {queries:>8} {rows:>10} {statistics.median(timings):>10.2f} {p95:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Seed a database with synthetic profiles for benchmarking.
+
+Each profile gets a realistic spread of projects, jobs, services and social
+links (a few people with long portfolios, most with a handful of entries, some
+hidden). Seeded profiles have ids "bench|<n>", so they are easy to tell apart
+from real users and to remove again with --reset.
+
+Run from the BackEnd directory (seeds DATABASE_URL, i.e. app.db by default):
+    python benchmarks/seed_data.py --profiles 1000
+    python benchmarks/seed_data.py --profiles 1000 --database sqlite:///./bench.db --reset
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+PROFILE_PREFIX = "bench|"
+
+FIRST_NAMES = ["Maria", "Giorgos", "Eleni", "Nikos", "Anna", "Kostas", "Sofia", "Dimitris", "Katerina", "Yannis"]
+LAST_NAMES = ["Papadopoulou", "Georgiou", "Nikolaou", "Ioannou", "Christodoulou", "Konstantinou", "Petrou"]
+PLATFORMS = ["github", "linkedin", "twitter", "instagram", "behance", "dribbble", "website", "youtube"]
+WORDS = ("design build ship scale data api cloud mobile web platform team product research "
+         "client growth brand system service analytics automation").split()
+
+# (min, mode, max) children per profile - triangular, so most profiles are small
+COUNTS = {"projects": (0, 3, 15), "jobs": (0, 2, 8), "services": (0, 2, 10), "social_links": (1, 3, 8)}
+HIDDEN_SHARE = 0.1  # share of children with appear = false
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _count(rng: random.Random, kind: str) -> int:
+    low, mode, high = COUNTS[kind]
+    return round(rng.triangular(low, high, mode))
+
+
+def build_rows(profiles: int, seed: int = 42) -> dict:
+    """Rows for every table as lists of dicts, ready for executemany inserts"""
+    rng = random.Random(seed)
+    rows = {"profiles": [], "projects": [], "jobs": [], "services": [], "social_links": []}
+    for n in range(profiles):
+        profile_id = f"{PROFILE_PREFIX}{n}"
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        rows["profiles"].append({
+            "id": profile_id, "FirstName": first, "LastName": last,
+            "email": f"{first.lower()}.{last.lower()}{n}@example.com",
+            "phone": f"+30 69{rng.randrange(10 ** 8):08d}",
+            "avatar_url": None,
+        })
+        for i in range(_count(rng, "projects")):
+            rows["projects"].append({
+                "profile_id": profile_id, "title": _text(rng, 3), "description": _text(rng, rng.randint(10, 60)),
+                "project_link": f"https://example.com/{n}/project/{i}", "sort_order": i,
+                "appear": rng.random() >= HIDDEN_SHARE,
+            })
+        for _ in range(_count(rng, "jobs")):
+            rows["jobs"].append({
+                "profile_id": profile_id, "title": _text(rng, 2), "description": _text(rng, rng.randint(10, 40)),
+                "appear": rng.random() >= HIDDEN_SHARE,
+            })
+        for i in range(_count(rng, "services")):
+            rows["services"].append({
+                "profile_id": profile_id, "title": _text(rng, 2), "description": _text(rng, rng.randint(5, 30)),
+                "sort_order": i, "appear": rng.random() >= HIDDEN_SHARE,
+            })
+        for platform in rng.sample(PLATFORMS, _count(rng, "social_links")):
+            rows["social_links"].append({
+                "profile_id": profile_id, "platform": platform, "url": f"https://{platform}.com/bench{n}",
+                "appear": rng.random() >= HIDDEN_SHARE,
+            })
+    return rows
+
+
+def seed(profiles: int, seed: int = 42, reset: bool = False) -> dict:
+    """Insert synthetic profiles into DATABASE_URL; returns row counts per table"""
+    from sqlalchemy import delete
+
+    from database import engine, init_db
+    from Models.ProfileModel import Profile
+    from Models.JobModel import Job
+    from Models.ProjectModel import Project
+    from Models.ServiceModel import Service
+    from Models.SocialLinkModel import SocialLink
+
+    tables = {"profiles": Profile, "projects": Project, "jobs": Job, "services": Service, "social_links": SocialLink}
+    init_db()
+    rows = build_rows(profiles, seed)
+    with engine.begin() as conn:
+        if reset:
+            for name, model in reversed(tables.items()):
+                column = model.id if name == "profiles" else model.profile_id
+                conn.execute(delete(model).where(column.startswith(PROFILE_PREFIX, autoescape=True)))
+        for name, model in tables.items():
+            if rows[name]:
+                conn.execute(model.__table__.insert(), rows[name])
+    return {name: len(table_rows) for name, table_rows in rows.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed - same seed, same data")
+    parser.add_argument("--database", help="SQLAlchemy URL (defaults to DATABASE_URL)")
+    parser.add_argument("--reset", action="store_true", help="delete previously seeded profiles first")
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ["DATABASE_URL"] = args.database
+    # The app modules read Auth0 settings at import time - seeding doesn't need real ones
+    for name in ("AUTH0_DOMAIN", "AUTH0_AUDIENCE", "AUTH0_CLIENT_ID", "AUTH0_CLIENT_SECRET"):
+        os.environ.setdefault(name, "benchmark")
+
+    start = time.perf_counter()
+    counts = seed(args.profiles, args.seed, args.reset)
+    elapsed = time.perf_counter() - start
+    print(", ".join(f"{count} {name}" for name, count in counts.items()) + f" inserted in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
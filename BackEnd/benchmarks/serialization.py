@@ -0,0 +1,103 @@
+"""Benchmark: serializing a large profile (ORM objects -> JSON bytes).
+
+Compares the ways a ProfileResponse can be produced from a loaded Profile:
+
+  jsonable+json   validate, dump to a JSON-compatible dict, json.dumps - what
+                  FastAPI does for response_model routes without its dump_json
+                  fast path (older releases, or any custom response class)
+  dict+orjson     the same dict, encoded with orjson
+  model_dump_json ProfileResponse.model_validate(...).model_dump_json()
+  adapter         serializers.dump_json - cached TypeAdapter, validate once and
+                  write JSON bytes in pydantic-core
+
+The profile is built in memory (no database), so only serialization is timed.
+
+Run from the BackEnd directory:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --sizes 10 100 500 --repeat 200
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# The app modules read Auth0 settings at import time - a benchmark doesn't need real ones
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+for name in ("AUTH0_DOMAIN", "AUTH0_AUDIENCE", "AUTH0_CLIENT_ID", "AUTH0_CLIENT_SECRET"):
+    os.environ.setdefault(name, "benchmark")
+
+from Models.ProfileModel import Profile  # noqa: E402
+from Models.JobModel import Job  # noqa: E402
+from Models.ServiceModel import Service  # noqa: E402
+from Models.ProjectModel import Project  # noqa: E402
+from Models.SocialLinkModel import SocialLink  # noqa: E402
+from Schemas.ProfileSchema import ProfileResponse  # noqa: E402
+from serializers import dump_json, get_adapter, orjson  # noqa: E402
+
+
+def build_profile(size: int) -> Profile:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    profile = Profile(id=f"bench|{size}", FirstName="Bench", LastName=str(size), email="bench@example.com",
+                      phone="+30 6900000000", avatar_url=None, created_at=now)
+    profile.jobs = [Job(id=i, profile_id=profile.id, title=f"Job {i}", description="x" * 200, appear=True)
+                    for i in range(size)]
+    profile.services = [Service(id=i, profile_id=profile.id, title=f"Service {i}", description="x" * 200,
+                                sort_order=i, appear=True) for i in range(size)]
+    profile.projects = [Project(id=i, profile_id=profile.id, title=f"Project {i}", description="x" * 200,
+                                project_link=f"https://example.com/{i}", sort_order=i, appear=True)
+                        for i in range(size)]
+    profile.social_links = [SocialLink(id=i, profile_id=profile.id, platform=f"site{i}",
+                                       url=f"https://example.com/{i}", appear=True) for i in range(size)]
+    return profile
+
+
+def _as_dict(profile: Profile) -> dict:
+    adapter = get_adapter(ProfileResponse)
+    return adapter.dump_python(adapter.validate_python(profile, from_attributes=True), mode="json")
+
+
+SERIALIZERS = {
+    "jsonable+json": lambda profile: json.dumps(
+        _as_dict(profile), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8"),
+    "model_dump_json": lambda profile: ProfileResponse.model_validate(profile).model_dump_json().encode("utf-8"),
+    "adapter": lambda profile: dump_json(ProfileResponse, profile),
+}
+if orjson is not None:
+    SERIALIZERS["dict+orjson"] = lambda profile: orjson.dumps(_as_dict(profile))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200],
+                        help="children per collection (each profile has this many jobs, services, projects and links)")
+    parser.add_argument("--repeat", type=int, default=100, help="timed serializations per method and size")
+    args = parser.parse_args()
+
+    print(f"{'children':>9} {'method':>16} {'bytes':>9} {'median ms':>10} {'p95 ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        profile = build_profile(size)
+        expected = json.loads(dump_json(ProfileResponse, profile))
+        baseline = None
+        for method, serialize in SERIALIZERS.items():
+            body = serialize(profile)  # warm up
+            assert json.loads(body) == expected, method
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                serialize(profile)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            median = statistics.median(timings)
+            baseline = baseline or median
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(f"{size * 4:>9} {method:>16} {len(body):>9} {median:>10.3f} {p95:>9.3f} {baseline / median:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Batched create/update/delete for the per-profile collections (projects, jobs, services, social links).
+
+A batch is authorized once and applied in a single transaction: creates go out
+as one multi-row INSERT ... RETURNING, updates as one executemany UPDATE by
+primary key and deletes as one DELETE ... WHERE id IN (...). These bypass the
+ORM flush, so the profile version is bumped explicitly. Updates and
+deletes may only target rows of the caller's own profile; if any of them
+doesn't, nothing is applied.
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import BULK_MAX_ITEMS
+from profile_cache import profile_cache
+from versioning import bump_profile_versions
+from Schemas.BulkSchema import BulkRequest
+
+
+def _values(item) -> dict:
+    values = item.model_dump(exclude={"id"})
+    if "sort_order" in values:
+        values["sort_order"] = values["sort_order"] or 0
+    return values
+
+
+def _validate(batch: BulkRequest) -> None:
+    size = len(batch.create) + len(batch.update) + len(batch.delete)
+    if size > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch has {size} items, the limit is {BULK_MAX_ITEMS}"
+        )
+    target_ids = [item.id for item in batch.update] + list(batch.delete)
+    if len(target_ids) != len(set(target_ids)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Each id may appear only once across update and delete"
+        )
+
+
+async def apply_bulk(db: AsyncSession, model, profile_id: str, batch: BulkRequest) -> dict:
+    """Apply a batch for `profile_id`; returns created/updated rows and deleted ids"""
+    _validate(batch)
+    update_ids = [item.id for item in batch.update]
+    target_ids = update_ids + list(batch.delete)
+
+    if target_ids:
+        result = await db.execute(
+            select(model.id).where(model.id.in_(target_ids), model.profile_id == profile_id)
+        )
+        missing = sorted(set(target_ids) - set(result.scalars().all()))
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Items not found: {missing}")
+
+    if batch.delete:
+        await db.execute(
+            delete(model).where(model.id.in_(batch.delete), model.profile_id == profile_id)
+        )
+
+    if batch.update:
+        # Updated rows are re-selected below, so the session doesn't need to sync them
+        await db.execute(
+            update(model).where(model.profile_id == profile_id),
+            [{"id": item.id, **_values(item)} for item in batch.update],
+            execution_options={"synchronize_session": None}
+        )
+
+    created = []
+    if batch.create:
+        result = await db.execute(
+            insert(model).returning(model),
+            [{**_values(item), "profile_id": profile_id} for item in batch.create]
+        )
+        created = list(result.scalars().all())
+
+    updated = []
+    if update_ids:
+        result = await db.execute(
+            select(model).where(model.id.in_(update_ids)).execution_options(populate_existing=True)
+        )
+        rows = {row.id: row for row in result.scalars().all()}
+        updated = [rows[item_id] for item_id in update_ids]
+
+    if target_ids or created:
+        await db.execute(bump_profile_versions([profile_id]))
+    await db.commit()
+    if target_ids or created:
+        profile_cache.invalidate(profile_id)
+    return {"created": created, "updated": updated, "deleted": list(batch.delete)}
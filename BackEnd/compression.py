@@ -0,0 +1,157 @@
+"""gzip / brotli response compression.
+
+`CompressionMiddleware` compresses responses on the fly when the client accepts
+it, the content type is on the allow-list and the body is large enough to be
+worth it. Responses that already carry a Content-Encoding are passed through,
+which is how cached payloads compressed once with `precompress()` are served
+without any per-request compression work.
+
+Brotli is used when the `brotli` package is installed, gzip otherwise.
+"""
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from config import (
+    COMPRESSION_MIN_SIZE, COMPRESSION_CONTENT_TYPES, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_PRECOMPRESS_GZIP_LEVEL, COMPRESSION_PRECOMPRESS_BROTLI_QUALITY,
+)
+
+try:
+    import brotli
+except ImportError:  # optional - gzip only
+    brotli = None
+
+# Preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """The best encoding the client accepts (q > 0), or None for identity"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, precompressed: bool = False) -> bytes:
+    # Cached payloads are compressed once, so they can afford a slower, denser setting
+    if encoding == "br":
+        quality = COMPRESSION_PRECOMPRESS_BROTLI_QUALITY if precompressed else COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = COMPRESSION_PRECOMPRESS_GZIP_LEVEL if precompressed else COMPRESSION_GZIP_LEVEL
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31: gzip container
+    return compressor.compress(body) + compressor.flush()
+
+
+def precompress(body: bytes) -> dict:
+    """Compressed copies of `body` by encoding name; empty below the size threshold.
+
+    CPU bound - call through run_in_threadpool (zlib and brotli release the GIL).
+    """
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return {}
+    return {encoding: compress(body, encoding, precompressed=True) for encoding in ENCODINGS}
+
+
+def _is_compressible(headers: Headers) -> bool:
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    return content_type in COMPRESSION_CONTENT_TYPES
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+            self.compress, self.finish = self._compressor.process, self._compressor.finish
+        else:
+            self._compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.finish = self._compressor.compress, self._compressor.flush
+
+
+class CompressionMiddleware:
+    """ASGI middleware: gzip/brotli for compressible responses of at least `minimum_size` bytes"""
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                # Held back until the first body chunk shows whether compression is worth it
+                start_message = message
+                return
+            if message_type != "http.response.body" or passthrough:
+                if start_message is not None:
+                    await send(start_message)
+                    start_message = None
+                passthrough = True
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is not None:
+                chunk = compressor.compress(body) if body else b""
+                if not more_body:
+                    chunk += compressor.finish()
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            start_message["headers"] = list(start_message.get("headers", []))
+            headers = MutableHeaders(scope=start_message)
+            compressible = start_message["status"] not in (204, 206, 304) and _is_compressible(headers)
+            if not compressible or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start_message)
+                start_message = None
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                # Streamed: length unknown up front
+                del headers["Content-Length"]
+                compressor = _StreamCompressor(encoding)
+                body = compressor.compress(body)
+            else:
+                body = compress(body, encoding)
+                headers["Content-Length"] = str(len(body))
+            await send(start_message)
+            start_message = None
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
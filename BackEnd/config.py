@@ -16,5 +16,125 @@ ALGORITHMS = ["RS256"]
 if not AUTH0_DOMAIN or not AUTH0_AUDIENCE or not AUTH0_CLIENT_ID or not AUTH0_CLIENT_SECRET:
     raise ValueError("AUTH0_DOMAIN, AUTH0_AUDIENCE, AUTH0_CLIENT_ID, and AUTH0_CLIENT_SECRET must be set in .env file")
 
+# Tenant base URL and token issuer - override AUTH0_BASE_URL to point at a local stand-in (benchmarks)
+AUTH0_BASE_URL = os.getenv("AUTH0_BASE_URL", f"https://{AUTH0_DOMAIN}").rstrip("/")
+AUTH0_ISSUER = f"{AUTH0_BASE_URL}/"
+
+# Debug mode - exposes diagnostics (e.g. SQL profiling headers) in responses
+DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+
+# Logging
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))  # share of requests whose DEBUG logs are kept
+
+# Shared HTTP client for Auth0 (token exchange, userinfo, JWKS)
+UPSTREAM_HTTP2 = os.getenv("UPSTREAM_HTTP2", "true").lower() in ("1", "true", "yes")  # needs the h2 package
+UPSTREAM_TIMEOUT = float(os.getenv("UPSTREAM_TIMEOUT", "10"))  # seconds per read/write/pool wait
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "60"))  # seconds an idle connection is kept
+
+# JWKS (signing keys) cache
+AUTH0_JWKS_URL = f"{AUTH0_BASE_URL}/.well-known/jwks.json"
+JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "600"))  # seconds
+JWKS_REFRESH_MARGIN = float(os.getenv("JWKS_REFRESH_MARGIN", "60"))  # refresh this long before expiry
+JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))  # rate limit for unknown kids
+JWKS_CACHE_PATH = os.getenv("JWKS_CACHE_PATH", str(Path(__file__).parent / "jwks_cache.json"))  # empty disables
+
+# Verified-token cache (number of distinct tokens kept in memory per worker)
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+
+# Concurrent /api/auth/refresh calls with the same refresh token share one Auth0 call;
+# its result is also reused for calls arriving this many seconds later
+AUTH_REFRESH_RESULT_TTL = float(os.getenv("AUTH_REFRESH_RESULT_TTL", "5"))
+
+# Profile ids known to exist in this worker - /api/profile/me skips provisioning for them
+KNOWN_PROFILES_MAX_SIZE = int(os.getenv("KNOWN_PROFILES_MAX_SIZE", "10000"))
+
+# Public profile response cache
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "1000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "60"))  # seconds
+PROFILE_CACHE_WARM_COUNT = int(os.getenv("PROFILE_CACHE_WARM_COUNT", "50"))  # most-viewed profiles built at startup
+PROFILE_CACHE_STATS_PATH = os.getenv("PROFILE_CACHE_STATS_PATH", str(Path(__file__).parent / "profile_views.json"))  # empty disables
+
 # Database Config
-DATABASE_URL = "sqlite:///./app.db"
+# DATABASE_URL is the synchronous URL (used by init_db and scripts). The async URL used by
+# the routers is derived from it unless ASYNC_DATABASE_URL is set explicitly.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+
+def _to_async_url(url: str) -> str:
+    """Map a sync SQLAlchemy URL to its async driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    for prefix in ("postgresql+psycopg2:", "postgresql:", "postgres:"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg:" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
+# SQLite engine profile (ignored for other databases)
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))  # page cache per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes, 0 disables
+# Separate read-only connections for GET endpoints, so readers never queue behind writers
+DB_READ_ONLY_CONNECTIONS = os.getenv("DB_READ_ONLY_CONNECTIONS", "true").lower() in ("1", "true", "yes")
+
+# Connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+
+# SQL profiling (opt-in; adds a small per-statement overhead)
+SQL_PROFILING = os.getenv("SQL_PROFILING", "false").lower() in ("1", "true", "yes")
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "100"))  # log statements slower than this with their plan
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))  # same statement shape this often per request
+
+# Bulk endpoints (POST /api/<entity>/bulk)
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))  # creates + updates + deletes per request
+
+# Keyset pagination of the per-profile list endpoints
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))  # page size when a cursor is sent without a limit
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+
+# HTTP caching of read endpoints (ETag / Last-Modified revalidation)
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))  # seconds a response is fresh without revalidating
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", "60"))  # seconds a stale copy may be served while revalidating
+
+# Uploads are streamed to disk; at most this many bytes are buffered in memory per upload
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+# Avatar processing (square variants as WebP + PNG/JPEG fallback, in a process pool)
+AVATAR_SIZES = tuple(sorted(int(size) for size in os.getenv("AVATAR_SIZES", "64,256,512").split(",")))
+AVATAR_DEFAULT_SIZE = int(os.getenv("AVATAR_DEFAULT_SIZE", "256"))  # variant avatar_url points at
+AVATAR_PROCESS_WORKERS = int(os.getenv("AVATAR_PROCESS_WORKERS", "2"))
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", str(40_000_000)))  # larger images are rejected undecoded
+
+# Response compression (gzip, plus brotli when the brotli package is installed)
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes; smaller bodies are sent as they are
+COMPRESSION_CONTENT_TYPES = frozenset(
+    t.strip().lower() for t in os.getenv(
+        "COMPRESSION_CONTENT_TYPES",
+        "application/json,text/html,text/plain,text/css,text/javascript,application/javascript,image/svg+xml"
+    ).split(",") if t.strip()
+)
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+# Cached payloads are compressed once per rebuild, so they use denser settings
+COMPRESSION_PRECOMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESSION_PRECOMPRESS_GZIP_LEVEL", "9"))
+COMPRESSION_PRECOMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESSION_PRECOMPRESS_BROTLI_QUALITY", "9"))
+
+# Rate limiting (token buckets per client and policy; see rate_limit.py)
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" (per worker) or "sqlite" (shared by workers)
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", str(Path(__file__).parent / "rate_limits.db"))
+# "<requests>/<second|minute|hour>" - the bucket holds that many requests and refills at that rate
+RATE_LIMIT_PUBLIC_READ = os.getenv("RATE_LIMIT_PUBLIC_READ", "300/minute")
+RATE_LIMIT_AUTHENTICATED_READ = os.getenv("RATE_LIMIT_AUTHENTICATED_READ", "600/minute")
+RATE_LIMIT_WRITE = os.getenv("RATE_LIMIT_WRITE", "120/minute")
+RATE_LIMIT_AUTH = os.getenv("RATE_LIMIT_AUTH", "30/minute")
+# Key anonymous clients on the first X-Forwarded-For address (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() in ("1", "true", "yes")
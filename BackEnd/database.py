@@ -1,11 +1,106 @@
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from config import DATABASE_URL
+from metrics import DB_POOL_CHECKOUTS, DB_POOL_CHECKOUT_WAIT, register_callback
+from config import (
+    DATABASE_URL, ASYNC_DATABASE_URL,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE,
+    DB_READ_ONLY_CONNECTIONS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, SQL_PROFILING
+)
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+_IS_SQLITE_FILE = IS_SQLITE and make_url(DATABASE_URL).database not in (None, "", ":memory:")
+
+_connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+_pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT} \
+    if (_IS_SQLITE_FILE or not IS_SQLITE) else {}
+
+
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool = False):
+    """Per-connection SQLite tuning, run once when the pool opens a connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        # busy_timeout first, so the remaining pragmas wait on locks instead of failing
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=1")
+        else:
+            # journal_mode is persistent in the file; read-only connections can't change it
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def _configure_sqlite(engine: Engine, read_only: bool = False):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=read_only)
+
+
+def _read_only_url(url: str) -> str:
+    """Turn a SQLite file URL into a read-only URI connection (file:...?mode=ro)"""
+    parsed = make_url(url)
+    return parsed.set(
+        database=f"file:{parsed.database}",
+        query={**parsed.query, "mode": "ro", "uri": "true"}
+    ).render_as_string(hide_password=False)
+
 
 # Database setup
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Sync engine - used for schema setup and scripts
+engine = create_engine(DATABASE_URL, connect_args=_connect_args, **_pool_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine - used by the API routers so queries don't block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_args)
+# expire_on_commit=False: returned objects stay readable after commit without implicit IO
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Read-only engine - with WAL, readers on their own connections never wait on the writer
+if _IS_SQLITE_FILE and DB_READ_ONLY_CONNECTIONS:
+    async_read_engine = create_async_engine(_read_only_url(ASYNC_DATABASE_URL), **_pool_args)
+else:
+    async_read_engine = async_engine
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if IS_SQLITE:
+    _configure_sqlite(engine)
+    _configure_sqlite(async_engine.sync_engine)
+    if async_read_engine is not async_engine:
+        _configure_sqlite(async_read_engine.sync_engine, read_only=True)
+
+# Pool metrics
+def _instrument_pool(engine: Engine, name: str):
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        DB_POOL_CHECKOUTS.inc(name)
+
+_instrumented_engines = {"sync": engine, "write": async_engine.sync_engine}
+if async_read_engine is not async_engine:
+    _instrumented_engines["read"] = async_read_engine.sync_engine
+for _name, _engine in _instrumented_engines.items():
+    _instrument_pool(_engine, _name)
+
+def _pool_checked_out():
+    for name, instrumented in _instrumented_engines.items():
+        checkedout = getattr(instrumented.pool, "checkedout", None)
+        if checkedout is not None:
+            yield (name,), checkedout()
+
+register_callback("db_pool_checked_out", "Connections currently checked out of the pool", _pool_checked_out, ("engine",))
+
+# Opt-in SQL profiling (statement counts, N+1 detection, slow-query plans)
+if SQL_PROFILING:
+    from sql_profiler import instrument_engine
+    for _engine in _instrumented_engines.values():
+        instrument_engine(_engine)
+
 Base = declarative_base()
 
 # Dependency
@@ -16,22 +111,22 @@ def get_db():
     finally:
         db.close()
 
-# Create all tables
+# Async dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        # Acquire the connection up front so pool waits are measured
+        with DB_POOL_CHECKOUT_WAIT.time("write"):
+            await db.connection()
+        yield db
+
+# Async dependency for read-only endpoints
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        with DB_POOL_CHECKOUT_WAIT.time("read" if async_read_engine is not async_engine else "write"):
+            await db.connection()
+        yield db
+
+# Create tables / apply pending schema migrations
 def init_db():
-    Base.metadata.create_all(bind=engine)
-    
-    # Manually add missing columns to existing tables
-    inspector = inspect(engine)
-    existing_columns = [col['name'] for col in inspector.get_columns('profiles')]
-    
-    if 'email' not in existing_columns:
-        with engine.connect() as conn:
-            conn.execute(text("ALTER TABLE profiles ADD COLUMN email VARCHAR"))
-            conn.commit()
-        print("Added email column to profiles table")
-    
-    if 'phone' not in existing_columns:
-        with engine.connect() as conn:
-            conn.execute(text("ALTER TABLE profiles ADD COLUMN phone VARCHAR"))
-            conn.commit()
-        print("Added phone column to profiles table")
+    from migrations import run_migrations
+    run_migrations(engine)
@@ -0,0 +1,94 @@
+"""Conditional GET support for profile-scoped read endpoints.
+
+ETags are derived from `profiles.version` (see versioning.py), which changes on
+every write to the profile or its children, and `profiles.created_at`, because
+a deleted and re-created profile starts again at version 1. A revalidation
+therefore needs a single primary-key lookup - the object graph is only loaded
+when the client's copy is out of date.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import HTTP_CACHE_MAX_AGE, HTTP_CACHE_STALE_WHILE_REVALIDATE
+from Models.ProfileModel import Profile
+
+
+class ProfileVersion(NamedTuple):
+    version: int
+    updated_at: Optional[datetime]
+    created_at: Optional[datetime] = None
+
+
+async def get_profile_version(db: AsyncSession, profile_id: str) -> Optional[ProfileVersion]:
+    result = await db.execute(
+        select(Profile.version, Profile.updated_at, Profile.created_at).where(Profile.id == profile_id)
+    )
+    row = result.first()
+    return ProfileVersion(row.version, row.updated_at, row.created_at) if row else None
+
+
+def make_etag(version: ProfileVersion) -> str:
+    # Weak: the same version may be sent with different content encodings
+    created = int(_as_utc(version.created_at).timestamp()) if version.created_at is not None else 0
+    return f'W/"{created:x}-{version.version}"'
+
+
+def cache_headers(version: ProfileVersion, private: bool = False) -> dict:
+    headers = {
+        "ETag": make_etag(version),
+        "Cache-Control": (
+            f"{'private' if private else 'public'}, max-age={HTTP_CACHE_MAX_AGE}, "
+            f"stale-while-revalidate={HTTP_CACHE_STALE_WHILE_REVALIDATE}"
+        ),
+    }
+    if version.updated_at is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(version.updated_at), usegmt=True)
+    return headers
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Timestamps are stored naive, in UTC (CURRENT_TIMESTAMP)
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def is_not_modified(request: Request, version: ProfileVersion) -> bool:
+    """Evaluate If-None-Match (weak comparison), or If-Modified-Since when no ETag was sent"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        current = make_etag(version).removeprefix("W/")
+        return any(tag.strip().removeprefix("W/") == current for tag in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and version.updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return _as_utc(version.updated_at).replace(microsecond=0) <= since
+    return False
+
+
+def not_modified_response(version: ProfileVersion, private: bool = False) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(version, private))
+
+
+async def check_profile_version(
+    request: Request, response: Response, db: AsyncSession, profile_id: str, private: bool = True
+) -> Optional[Response]:
+    """For list endpoints: a 304 response if the client's copy is current, else None (validators set on `response`)"""
+    version = await get_profile_version(db, profile_id)
+    if version is None:
+        return None
+    if is_not_modified(request, version):
+        return not_modified_response(version, private)
+    response.headers.update(cache_headers(version, private))
+    return None
@@ -0,0 +1,58 @@
+"""Shared HTTP client for upstream (Auth0) calls.
+
+One pooled `httpx.AsyncClient` per worker, opened in the app lifespan and
+closed on shutdown, so the token exchange, userinfo and JWKS requests reuse
+keep-alive connections instead of paying a TCP + TLS handshake every call.
+HTTP/2 is used when the `h2` package is installed.
+"""
+from typing import Optional
+
+import httpx
+
+from config import (
+    UPSTREAM_HTTP2, UPSTREAM_TIMEOUT, UPSTREAM_CONNECT_TIMEOUT,
+    UPSTREAM_MAX_CONNECTIONS, UPSTREAM_MAX_KEEPALIVE_CONNECTIONS, UPSTREAM_KEEPALIVE_EXPIRY,
+)
+from logging_config import get_logger
+
+logger = get_logger("http_client")
+
+try:
+    import h2  # noqa: F401 - only needed for httpx's HTTP/2 support
+    HTTP2_AVAILABLE = True
+except ImportError:  # optional - HTTP/1.1 with keep-alive
+    HTTP2_AVAILABLE = False
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _create_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=UPSTREAM_HTTP2 and HTTP2_AVAILABLE,
+        timeout=httpx.Timeout(UPSTREAM_TIMEOUT, connect=UPSTREAM_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+def start_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+        logger.debug("Opened upstream HTTP client (http2=%s)", UPSTREAM_HTTP2 and HTTP2_AVAILABLE)
+    return _client
+
+
+def get_client() -> httpx.AsyncClient:
+    """The shared client; opened on first use outside the app lifespan (scripts)"""
+    return start_client()
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from jose import jwk
+from jose.backends.base import Key
+
+from http_client import get_client
+from logging_config import get_logger
+from metrics import AUTH0_UPSTREAM_DURATION
+
+logger = get_logger("jwks")
+
+
+class JWKSManager:
+    """Async JWKS cache: keys indexed by `kid`, refreshed in the background before they go stale.
+
+    - Keys are converted to jose `Key` objects once per fetch, not once per request.
+    - An unknown `kid` triggers a refetch (key rotation), rate limited so a flood of
+      forged tokens cannot hammer the JWKS endpoint.
+    - The last good key set is written to disk so freshly started workers start warm.
+    - If a refresh fails, the previous keys stay in use until a later refresh succeeds.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        ttl: float = 600,
+        refresh_margin: float = 60,
+        min_refetch_interval: float = 30,
+        cache_path: Optional[str] = None,
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.refresh_margin = min(refresh_margin, ttl / 2)
+        self.min_refetch_interval = min_refetch_interval
+        self.cache_path = Path(cache_path) if cache_path else None
+
+        self._keys: dict[str, Key] = {}
+        self._fetched_at = 0.0
+        self._last_forced_fetch = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def expires_at(self) -> float:
+        return self._fetched_at + self.ttl
+
+    def is_fresh(self) -> bool:
+        return bool(self._keys) and time.time() < self.expires_at
+
+    async def get_signing_key(self, kid: str) -> Optional[Key]:
+        """Return the verification key for `kid`, fetching the key set if needed"""
+        if not self.is_fresh():
+            await self.refresh(if_older_than=self._fetched_at)
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid - the tenant may have rotated its signing key
+        now = time.monotonic()
+        if now - self._last_forced_fetch >= self.min_refetch_interval:
+            self._last_forced_fetch = now
+            await self.refresh(if_older_than=self._fetched_at)
+            key = self._keys.get(kid)
+        return key
+
+    async def refresh(self, if_older_than: Optional[float] = None) -> None:
+        """Fetch the key set. Concurrent callers share a single upstream request."""
+        async with self._lock:
+            # Another coroutine refreshed while we were waiting for the lock
+            if if_older_than is not None and self._fetched_at > if_older_than:
+                return
+
+            try:
+                with AUTH0_UPSTREAM_DURATION.time("jwks", "error") as timer:
+                    response = await get_client().get(self.url)
+                    timer.labels = ("jwks", str(response.status_code))
+                response.raise_for_status()
+                jwks = response.json()
+                keys = self._build_keys(jwks)
+            except Exception as e:
+                if self._keys:
+                    logger.warning("JWKS refresh failed, keeping previous keys: %s", e)
+                    return
+                raise
+
+            self._keys = keys
+            self._fetched_at = time.time()
+            self._persist(jwks)
+
+    @staticmethod
+    def _build_keys(jwks: dict) -> dict[str, Key]:
+        keys = {}
+        for key_data in jwks.get("keys", []):
+            kid = key_data.get("kid")
+            if not kid or key_data.get("use", "sig") != "sig":
+                continue
+            try:
+                keys[kid] = jwk.construct(key_data, algorithm=key_data.get("alg", "RS256"))
+            except Exception as e:
+                logger.warning("Skipping unusable JWKS key '%s': %s", kid, e)
+        if not keys:
+            raise ValueError("JWKS response contains no usable signing keys")
+        return keys
+
+    def load_from_disk(self) -> bool:
+        """Warm the cache from the last persisted key set. Returns True if keys were loaded."""
+        if not self.cache_path or not self.cache_path.exists():
+            return False
+        try:
+            data = json.loads(self.cache_path.read_text())
+            self._keys = self._build_keys(data["jwks"])
+            self._fetched_at = float(data["fetched_at"])
+            return True
+        except Exception as e:
+            logger.warning("Ignoring unreadable JWKS cache file %s: %s", self.cache_path, e)
+            return False
+
+    def _persist(self, jwks: dict) -> None:
+        if not self.cache_path:
+            return
+        try:
+            # Write to a temp file and rename so other workers never read a partial file
+            tmp_path = self.cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps({"fetched_at": self._fetched_at, "jwks": jwks}))
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning("Could not persist JWKS cache: %s", e)
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            delay = self.expires_at - self.refresh_margin - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("Background JWKS refresh failed: %s", e)
+            if not self.is_fresh():
+                # Upstream is failing - retry soon instead of spinning
+                await asyncio.sleep(self.min_refetch_interval)
+
+    def start(self) -> None:
+        """Load persisted keys and start the background refresh task"""
+        self.load_from_disk()
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
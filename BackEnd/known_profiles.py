@@ -0,0 +1,39 @@
+import threading
+from collections import OrderedDict
+
+
+class KnownProfiles:
+    """Bounded LRU set of profile ids this worker has provisioned or seen in the database.
+
+    Lets /api/profile/me skip the provisioning upsert for users it already knows.
+    Only a hint: a profile deleted through another worker is noticed when loading
+    it returns nothing, and is provisioned again.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, profile_id: str) -> bool:
+        with self._lock:
+            if profile_id not in self._ids:
+                return False
+            self._ids.move_to_end(profile_id)
+            return True
+
+    def add(self, profile_id: str) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._ids[profile_id] = None
+            self._ids.move_to_end(profile_id)
+            while len(self._ids) > self.max_size:
+                self._ids.popitem(last=False)
+
+    def discard(self, profile_id: str) -> None:
+        with self._lock:
+            self._ids.pop(profile_id, None)
+
+    def __len__(self) -> int:
+        return len(self._ids)
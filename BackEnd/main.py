@@ -1,27 +1,66 @@
 from fastapi import FastAPI, Request, status, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import SQLAlchemyError
 from pathlib import Path
+from contextlib import asynccontextmanager
 from database import init_db
-from Routes import auth, profiles, services, social_links, projects, jobs
-import traceback
+from auth import jwks_manager
+from http_client import start_client, close_client
+from profile_cache import profile_cache
+from avatars import start_pool as start_avatar_pool, shutdown_pool as shutdown_avatar_pool
+from config import PROFILE_CACHE_WARM_COUNT, PROFILE_CACHE_STATS_PATH, SQL_PROFILING, RATE_LIMIT_ENABLED
+from Routes import auth, avatars, profiles, services, social_links, projects, jobs
+from logging_config import setup_logging, shutdown_logging, get_logger, RequestContextMiddleware
+from metrics import MetricsMiddleware, render_metrics
+from compression import CompressionMiddleware
+from serializers import ORJSONResponse
+from rate_limit import RateLimitMiddleware
+import versioning  # noqa: F401 - registers the profile version hook on ORM flushes
+import asyncio
 
-# Initialize database
-init_db()
+setup_logging()
+logger = get_logger("main")
 
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = Path("uploads/avatars")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Create FastAPI app with redirect_slashes=False
-app = FastAPI(redirect_slashes=False)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: logging writer thread (restarted if a previous lifespan stopped it)
+    setup_logging()
+    # Bring the schema up to date (a no-op version check once migrated)
+    init_db()
+    # Avatar processing workers (started from a forkserver, not forked from this process)
+    start_avatar_pool()
+    # Pooled keep-alive client for Auth0 (token exchange, userinfo, JWKS)
+    start_client()
+    # Warm JWKS from disk and keep it fresh in the background
+    jwks_manager.start()
+    # Warm the public profile cache with the most viewed profiles of earlier runs (in the background)
+    profile_cache.load_view_counts(PROFILE_CACHE_STATS_PATH)
+    warm_task = asyncio.create_task(
+        profile_cache.warm(profiles.build_public_profile, profile_cache.most_viewed(PROFILE_CACHE_WARM_COUNT))
+    )
+    yield
+    # Shutdown
+    warm_task.cancel()
+    profile_cache.save_view_counts(PROFILE_CACHE_STATS_PATH)
+    await jwks_manager.stop()
+    await close_client()
+    shutdown_avatar_pool()
+    shutdown_logging()
+
+# Create FastAPI app with redirect_slashes=False. Routes returning ORM rows serialize them
+# with serializers.json_response; ORJSONResponse covers plain dict responses.
+app = FastAPI(redirect_slashes=False, lifespan=lifespan, default_response_class=ORJSONResponse)
 
-# Serve static files (avatars)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Per-client rate limits (innermost, so 429 responses still get CORS headers)
+if RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
 
 # CORS - Important for cookies
 app.add_middleware(
@@ -33,6 +72,20 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# gzip / brotli for JSON and text responses (cached profiles arrive already compressed)
+app.add_middleware(CompressionMiddleware)
+
+# Per-request SQL statement counts / N+1 detection (opt-in, inside the request-id middleware)
+if SQL_PROFILING:
+    from sql_profiler import SqlProfilerMiddleware
+    app.add_middleware(SqlProfilerMiddleware)
+
+# Request id for log correlation (also returned as X-Request-ID)
+app.add_middleware(RequestContextMiddleware)
+
+# Per-route latency / in-flight metrics (outermost, so it times everything above)
+app.add_middleware(MetricsMiddleware)
+
 # ========== ERROR HANDLERS ==========
 
 @app.exception_handler(RequestValidationError)
@@ -72,8 +125,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
 @app.exception_handler(SQLAlchemyError)
 async def database_exception_handler(request: Request, exc: SQLAlchemyError):
     """Handle database errors"""
-    print(f"❌ Database Error: {exc}")
-    traceback.print_exc()
+    logger.error("Database error on %s %s", request.method, request.url.path, exc_info=exc)
     
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -87,8 +139,7 @@ async def database_exception_handler(request: Request, exc: SQLAlchemyError):
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle all other exceptions"""
-    print(f"❌ Unhandled Error: {exc}")
-    traceback.print_exc()
+    logger.error("Unhandled error on %s %s", request.method, request.url.path, exc_info=exc)
     
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -133,7 +184,7 @@ def custom_openapi():
         for method, operation in path_item.items():
             if method in ["get", "post", "put", "delete", "patch"]:
                 # Skip public endpoints
-                if path in ["/", "/api/auth/login", "/api/auth/callback", "/api/auth/logout", "/openapi.json", "/docs", "/redoc"]:
+                if path in ["/", "/api/auth/login", "/api/auth/callback", "/api/auth/logout", "/openapi.json", "/docs", "/redoc", "/metrics"]:
                     continue
                 # Add security requirements - allow both methods
                 if "security" not in operation:
@@ -154,6 +205,12 @@ app.include_router(services.router)
 app.include_router(social_links.router)
 app.include_router(projects.router)
 app.include_router(jobs.router)
+app.include_router(avatars.router)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of this worker's metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.get("/")
 def read_root():
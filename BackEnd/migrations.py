@@ -0,0 +1,220 @@
+"""Versioned schema migrations.
+
+Applied versions are recorded in the `schema_migrations` table, so each
+migration runs once per database. At startup the app only reads the current
+version; pending migrations run inside a write lock, so several workers
+starting at once don't race each other.
+
+Migration 1 is a frozen snapshot of the pre-migration schema, not the current
+models; every later migration spells out its own DDL against the schema the
+previous ones left, so each change is applied exactly once.
+
+Run manually with:
+    python migrations.py
+"""
+from datetime import datetime
+from typing import Callable, List, Sequence, Tuple
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text, func, inspect, text,
+)
+from sqlalchemy.engine import Connection, Engine
+
+from logging_config import get_logger
+
+logger = get_logger("migrations")
+
+_migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migrations_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+# ========== BASELINE SCHEMA ==========
+
+# The tables as the app created them before migrations existed. Frozen: later schema
+# changes go into new migrations (and the models), never in here.
+_baseline_metadata = MetaData()
+Table(
+    "profiles", _baseline_metadata,
+    Column("id", String, primary_key=True),
+    Column("created_at", DateTime, default=func.now()),
+    Column("FirstName", String),
+    Column("LastName", String),
+    Column("avatar_url", String, nullable=True),
+    Column("email", String, nullable=True),
+    Column("phone", String, nullable=True),
+)
+Table(
+    "services", _baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("profile_id", String, ForeignKey("profiles.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("sort_order", Integer, default=0),
+    Column("appear", Boolean, default=True),
+)
+Table(
+    "social_links", _baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("profile_id", String, ForeignKey("profiles.id"), nullable=False),
+    Column("platform", String, nullable=False),
+    Column("url", String, nullable=False),
+    Column("appear", Boolean, default=True),
+)
+Table(
+    "projects", _baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("profile_id", String, ForeignKey("profiles.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("project_link", String, nullable=True),
+    Column("sort_order", Integer, default=0),
+    Column("appear", Boolean, default=True),
+)
+Table(
+    "jobs", _baseline_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("profile_id", String, ForeignKey("profiles.id"), nullable=False),
+    Column("title", String, nullable=False),
+    Column("description", Text, nullable=True),
+    Column("appear", Boolean, default=True),
+)
+
+
+# ========== HELPERS ==========
+
+def _add_column(conn: Connection, table: str, column: str, ddl_type: str):
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: Sequence[str], visible_only: bool = False):
+    """CREATE INDEX; `visible_only` makes it a partial index over appear = 1 rows"""
+    where = ""
+    if visible_only:
+        where = " WHERE appear" if conn.dialect.name == "postgresql" else " WHERE appear = 1"
+    conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)}){where}"))
+
+
+def _recreate_index(conn: Connection, name: str, table: str, columns: Sequence[str]):
+    conn.execute(text(f"DROP INDEX {name}"))
+    _create_index(conn, name, table, columns)
+
+
+# ========== MIGRATIONS ==========
+
+def _initial_schema(conn: Connection):
+    """Tables as created by the old init_db(), including its hand-added profile columns.
+
+    Databases created before migrations existed already have these tables - they are adopted
+    as they are, with only the columns old init_db() added by hand filled in.
+    """
+    _baseline_metadata.create_all(bind=conn)
+    existing = [col["name"] for col in inspect(conn).get_columns("profiles")]
+    for column in ("email", "phone"):
+        if column not in existing:
+            _add_column(conn, "profiles", column, "VARCHAR")
+
+
+def _profile_lookup_indexes(conn: Connection):
+    """Per-profile lookups and ordering, plus partial indexes for visible (appear = 1) rows"""
+    _create_index(conn, "ix_projects_profile_sort", "projects", ("profile_id", "sort_order"))
+    _create_index(conn, "ix_projects_profile_sort_visible", "projects", ("profile_id", "sort_order"), visible_only=True)
+    _create_index(conn, "ix_services_profile_sort", "services", ("profile_id", "sort_order"))
+    _create_index(conn, "ix_services_profile_sort_visible", "services", ("profile_id", "sort_order"), visible_only=True)
+    _create_index(conn, "ix_jobs_profile_id", "jobs", ("profile_id",))
+    _create_index(conn, "ix_jobs_profile_visible", "jobs", ("profile_id",), visible_only=True)
+    _create_index(conn, "ix_social_links_profile_id", "social_links", ("profile_id",))
+    _create_index(conn, "ix_social_links_profile_visible", "social_links", ("profile_id",), visible_only=True)
+
+
+def _keyset_pagination_indexes(conn: Connection):
+    """Per-profile indexes end in `id`, so (sort_order, id) keyset pages are index seeks"""
+    # NULL sort_order would drop rows out of keyset comparisons; the API always writes 0
+    conn.execute(text("UPDATE projects SET sort_order = 0 WHERE sort_order IS NULL"))
+    conn.execute(text("UPDATE services SET sort_order = 0 WHERE sort_order IS NULL"))
+    _recreate_index(conn, "ix_projects_profile_sort", "projects", ("profile_id", "sort_order", "id"))
+    _recreate_index(conn, "ix_services_profile_sort", "services", ("profile_id", "sort_order", "id"))
+    _recreate_index(conn, "ix_jobs_profile_id", "jobs", ("profile_id", "id"))
+    _recreate_index(conn, "ix_social_links_profile_id", "social_links", ("profile_id", "id"))
+
+
+def _profile_versions(conn: Connection):
+    """updated_at on every table and a per-profile version counter (ETags / conditional GETs)"""
+    for table in ("profiles", "projects", "jobs", "services", "social_links"):
+        # SQLite can't ADD COLUMN with a non-constant default - add it empty, then backfill
+        _add_column(conn, table, "updated_at", "TIMESTAMP")
+        conn.execute(text(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP"))
+    _add_column(conn, "profiles", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+# (version, name, function) - append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial_schema", _initial_schema),
+    (2, "profile_lookup_indexes", _profile_lookup_indexes),
+    (3, "keyset_pagination_indexes", _keyset_pagination_indexes),
+    (4, "profile_versions", _profile_versions),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ========== RUNNER ==========
+
+def current_version(conn: Connection) -> int:
+    if not inspect(conn).has_table("schema_migrations"):
+        return 0
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def _apply_pending(conn: Connection) -> List[int]:
+    schema_migrations.create(conn, checkfirst=True)
+    # Re-read under the lock - another worker may have migrated while we waited
+    version = current_version(conn)
+    applied = []
+    for migration_version, name, migrate in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        migrate(conn)
+        conn.execute(schema_migrations.insert().values(
+            version=migration_version, name=name, applied_at=datetime.utcnow()
+        ))
+        applied.append(migration_version)
+    return applied
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply pending migrations; returns the versions that were applied"""
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return []
+
+    if engine.dialect.name == "sqlite":
+        # BEGIN IMMEDIATE takes the write lock up front; SQLite DDL is transactional
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                applied = _apply_pending(conn)
+                conn.exec_driver_sql("COMMIT")
+            except Exception:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+    else:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('bioconnect_migrations'))"))
+            applied = _apply_pending(conn)
+
+    for version in applied:
+        logger.info("Applied migration %s", version)
+    return applied
+
+
+if __name__ == "__main__":
+    from database import engine
+    applied = run_migrations(engine)
+    print(f"Database is at version {LATEST_VERSION} ({len(applied)} migration(s) applied)")
@@ -0,0 +1,79 @@
+"""Keyset (cursor) pagination for the per-profile list endpoints.
+
+Pages are ordered by a unique key - (sort_order, id), or just id for
+collections without sort_order - and the next page starts after the last key
+of the previous one (`WHERE (sort_order, id) > (:a, :b)`). With the matching
+(profile_id, sort_order, id) index this is an index seek, so page N costs the
+same as page 1, unlike OFFSET.
+
+The list itself stays the response body; the cursor of the next page is sent
+in the X-Next-Cursor header (absent on the last page). Paging is opt-in: a
+request with neither `limit` nor `cursor` gets the whole list, as before.
+"""
+import base64
+import json
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import PAGE_DEFAULT_LIMIT, PAGE_MAX_LIMIT
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams:
+    """Dependency for the `limit` and `cursor` query parameters"""
+
+    def __init__(
+        self,
+        limit: Optional[int] = Query(
+            None, ge=1, le=PAGE_MAX_LIMIT,
+            description=f"Maximum number of items (default: all, or {PAGE_DEFAULT_LIMIT} when a cursor is given)"
+        ),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+async def paginate(db: AsyncSession, stmt: Select, key_columns: Sequence, page: PageParams, response: Response) -> list:
+    """Run `stmt` for one page ordered by `key_columns`; sets X-Next-Cursor when more rows follow"""
+    stmt = stmt.order_by(*key_columns)
+    limit = page.limit or (PAGE_DEFAULT_LIMIT if page.cursor else None)
+    if limit is None:
+        # Unpaged request - the full list
+        result = await db.execute(stmt)
+        return list(result.scalars().all())
+
+    if page.cursor:
+        after = decode_cursor(page.cursor, len(key_columns))
+        if len(key_columns) == 1:
+            stmt = stmt.where(key_columns[0] > after[0])
+        else:
+            stmt = stmt.where(tuple_(*key_columns) > tuple_(*after))
+
+    # One extra row tells whether another page exists
+    result = await db.execute(stmt.limit(limit + 1))
+    items = list(result.scalars().all())
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor([getattr(last, column.key) for column in key_columns])
+    return items
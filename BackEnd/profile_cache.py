@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from datetime import datetime
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+from config import PROFILE_CACHE_MAX_ENTRIES, PROFILE_CACHE_TTL
+from singleflight import SingleFlight
+from logging_config import get_logger
+from metrics import register_callback
+
+logger = get_logger("profile_cache")
+
+
+class CachedProfile(NamedTuple):
+    body: bytes
+    version: int  # profiles.version the body was built from
+    updated_at: Optional[datetime]
+    created_at: Optional[datetime]  # part of the ETag - a re-created profile restarts at version 1
+    # Compressed copies of body (see compression.precompress), so cache hits skip compression
+    gzip: Optional[bytes] = None
+    br: Optional[bytes] = None
+
+    def encoded(self, encoding: Optional[str]) -> Optional[bytes]:
+        """The body compressed with `encoding`, if a precompressed copy exists"""
+        return getattr(self, encoding) if encoding in ("gzip", "br") else None
+
+
+# Builds the serialized public profile, or returns None if the profile does not exist
+ProfileBuilder = Callable[[str], Awaitable[Optional[CachedProfile]]]
+
+
+class ProfileCache:
+    """LRU/TTL cache of serialized public profile responses, keyed by profile id and variant.
+
+    The variant distinguishes sparse responses (?fields= / ?include=) from the
+    full one (""). Writes to a profile or any of its children call `invalidate()`,
+    which drops every variant of that profile. The cache is per worker: other
+    workers pick up the change when their entry's TTL runs out.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple[str, str], tuple[float, CachedProfile]]" = OrderedDict()
+        self._variants: dict[str, set[str]] = {}  # profile id -> cached variants
+        # Bumped on every invalidation so an in-flight rebuild can't store stale data
+        self._generations: Counter = Counter()
+        self._views: Counter = Counter()  # views during this run
+        self._previous_views: Counter = Counter()  # views saved by earlier runs
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, profile_id: str, variant: str = "") -> Optional[CachedProfile]:
+        key = (profile_id, variant)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, cached = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return cached
+
+    def set(self, profile_id: str, cached: CachedProfile, generation: Optional[int] = None, variant: str = "") -> None:
+        key = (profile_id, variant)
+        with self._lock:
+            if generation is not None and generation != self._generations[profile_id]:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, cached)
+            self._entries.move_to_end(key)
+            self._variants.setdefault(profile_id, set()).add(variant)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        """Drop one entry; caller holds the lock"""
+        self._entries.pop(key, None)
+        profile_id, variant = key
+        variants = self._variants.get(profile_id)
+        if variants is not None:
+            variants.discard(variant)
+            if not variants:
+                del self._variants[profile_id]
+
+    def invalidate(self, profile_id: str) -> None:
+        with self._lock:
+            for variant in self._variants.pop(profile_id, ()):
+                self._entries.pop((profile_id, variant), None)
+            self._generations[profile_id] += 1
+
+    async def get_or_build(self, profile_id: str, builder: ProfileBuilder, variant: str = "",
+                           min_version: int = 0) -> Optional[CachedProfile]:
+        """Return the cached entry, rebuilding it once for all concurrent callers on a miss.
+
+        An entry older than `min_version` (written through another worker) counts as a miss.
+        """
+        self._views[profile_id] += 1
+        cached = self.get(profile_id, variant)
+        if cached is not None and cached.version >= min_version:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        return await self._flights.do((profile_id, variant), lambda: self._build(profile_id, builder, variant))
+
+    async def _build(self, profile_id: str, builder: ProfileBuilder, variant: str = "") -> Optional[CachedProfile]:
+        generation = self._generations[profile_id]
+        cached = await builder(profile_id)
+        if cached is not None:
+            self.set(profile_id, cached, generation=generation, variant=variant)
+        return cached
+
+    async def warm(self, builder: ProfileBuilder, profile_ids: list[str]) -> int:
+        """Pre-build entries; returns the number of profiles cached"""
+        warmed = 0
+        for profile_id in profile_ids:
+            try:
+                if await self._flights.do((profile_id, ""), lambda: self._build(profile_id, builder)) is not None:
+                    warmed += 1
+            except Exception as e:
+                logger.warning("Could not warm profile cache for '%s': %s", profile_id, e)
+        return warmed
+
+    def most_viewed(self, limit: int) -> list[str]:
+        combined = self._previous_views + self._views
+        return [profile_id for profile_id, _ in combined.most_common(limit)]
+
+    def load_view_counts(self, path: Optional[str]) -> None:
+        """Seed view counters from a previous run"""
+        if not path or not Path(path).exists():
+            return
+        try:
+            self._previous_views = Counter(json.loads(Path(path).read_text()))
+        except Exception as e:
+            logger.warning("Ignoring unreadable profile view stats %s: %s", path, e)
+
+    def save_view_counts(self, path: Optional[str], keep: int = 1000) -> None:
+        """Persist the most viewed profile ids, merged with what other workers saved"""
+        if not path:
+            return
+        try:
+            target = Path(path)
+            merged = Counter(self._views)
+            if target.exists():
+                merged.update(json.loads(target.read_text()))
+            tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(dict(merged.most_common(keep))))
+            os.replace(tmp_path, target)
+        except Exception as e:
+            logger.warning("Could not save profile view stats: %s", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "in_flight": self._flights.in_flight(),
+        }
+
+
+profile_cache = ProfileCache(max_entries=PROFILE_CACHE_MAX_ENTRIES, ttl=PROFILE_CACHE_TTL)
+register_callback(
+    "profile_cache_lookups_total", "Public profile cache lookups",
+    lambda: [(("hit",), profile_cache.hits), (("miss",), profile_cache.misses)], ("result",), kind="counter"
+)
@@ -0,0 +1,232 @@
+"""Token-bucket rate limiting per client and policy.
+
+Every request is charged to one policy - auth endpoints, writes, authenticated
+reads or public reads - and to one client: the token's `sub` when the token was
+already verified (looked up in the token cache, so nothing is verified twice),
+otherwise the client IP. A bucket holds `capacity` requests and refills at
+`rate` per second; an empty bucket means 429 with Retry-After.
+
+Backends:
+- MemoryBackend: per worker, no I/O. With N workers a client gets up to N times the limit.
+- SQLiteBackend: one small table in its own database file, shared by all workers
+  on the host; each check is a single atomic upsert.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import cookie_parser
+from starlette.responses import JSONResponse
+
+from config import (
+    RATE_LIMIT_BACKEND, RATE_LIMIT_SQLITE_PATH, RATE_LIMIT_TRUST_FORWARDED,
+    RATE_LIMIT_PUBLIC_READ, RATE_LIMIT_AUTHENTICATED_READ, RATE_LIMIT_WRITE, RATE_LIMIT_AUTH,
+)
+from auth import token_cache
+from logging_config import get_logger
+from metrics import RATE_LIMIT_REJECTIONS
+
+logger = get_logger("rate_limit")
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+
+class RatePolicy(NamedTuple):
+    name: str
+    capacity: float  # burst size
+    rate: float  # tokens added per second
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RatePolicy":
+        """Parse a spec such as 300/minute (requests per second, minute or hour)"""
+        count, _, period = spec.partition("/")
+        if period.strip() not in PERIODS or not count.strip().isdigit() or int(count) <= 0:
+            raise ValueError(f"Invalid rate limit for {name}: {spec!r} (expected e.g. '300/minute')")
+        return cls(name, float(count), int(count) / PERIODS[period.strip()])
+
+    @property
+    def refill_time(self) -> float:
+        """Seconds an empty bucket takes to fill up again"""
+        return self.capacity / self.rate
+
+
+class MemoryBackend:
+    """Buckets in this worker's memory, least recently used first"""
+
+    def __init__(self):
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self._max_idle = 0.0
+
+    async def hit(self, key: str, policy: RatePolicy) -> float:
+        """Take a token; returns 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (policy.capacity, now))
+            tokens = min(policy.capacity, tokens + (now - updated_at) * policy.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            self._buckets.move_to_end(key)
+            self._max_idle = max(self._max_idle, policy.refill_time)
+            self._sweep(now)
+        return 0.0 if allowed else (1 - tokens) / policy.rate
+
+    def _sweep(self, now: float) -> None:
+        # Buckets untouched for a full refill are full again - same as having no entry
+        while self._buckets:
+            _, (_, updated_at) = next(iter(self._buckets.items()))
+            if now - updated_at < self._max_idle:
+                break
+            self._buckets.popitem(last=False)
+
+
+class SQLiteBackend:
+    """Buckets in a SQLite file, so every worker on the host draws from the same bucket"""
+
+    # Refill, take a token if there is one and report the outcome - atomically, in one statement.
+    # SET expressions all see the row's previous values.
+    HIT_SQL = """
+        INSERT INTO rate_limits (key, tokens, allowed, updated_at) VALUES (:key, :capacity - 1, 1, :now)
+        ON CONFLICT (key) DO UPDATE SET
+            tokens = min(:capacity, tokens + max(0, :now - updated_at) * :rate)
+                     - (min(:capacity, tokens + max(0, :now - updated_at) * :rate) >= 1),
+            allowed = min(:capacity, tokens + max(0, :now - updated_at) * :rate) >= 1,
+            updated_at = :now
+        RETURNING allowed, tokens
+    """
+
+    def __init__(self, path: str, purge_interval: float = 60):
+        self.path = path
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._next_purge = 0.0
+        self._max_idle = 0.0
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, allowed INTEGER NOT NULL, updated_at REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=1.0, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")  # counters only - losing the last writes in a crash is harmless
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per threadpool thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _hit(self, key: str, policy: RatePolicy) -> float:
+        now = time.time()  # wall clock - shared with the other processes
+        conn = self._connection()
+        allowed, tokens = conn.execute(
+            self.HIT_SQL, {"key": key, "capacity": policy.capacity, "rate": policy.rate, "now": now}
+        ).fetchone()
+        self._max_idle = max(self._max_idle, policy.refill_time)
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval
+            conn.execute("DELETE FROM rate_limits WHERE updated_at < ?", (now - self._max_idle,))
+        return 0.0 if allowed else (1 - tokens) / policy.rate
+
+    async def hit(self, key: str, policy: RatePolicy) -> float:
+        return await run_in_threadpool(self._hit, key, policy)
+
+
+def create_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SQLiteBackend(RATE_LIMIT_SQLITE_PATH)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r} (expected 'memory' or 'sqlite')")
+
+
+class RateLimitMiddleware:
+    """ASGI middleware: answers 429 with Retry-After once a client's bucket for the request's policy is empty"""
+
+    def __init__(
+        self,
+        app,
+        backend=None,
+        public_read: str = RATE_LIMIT_PUBLIC_READ,
+        authenticated_read: str = RATE_LIMIT_AUTHENTICATED_READ,
+        write: str = RATE_LIMIT_WRITE,
+        auth: str = RATE_LIMIT_AUTH,
+        exempt_paths: Sequence[str] = ("/", "/metrics", "/docs", "/redoc", "/openapi.json"),
+        trust_forwarded: bool = RATE_LIMIT_TRUST_FORWARDED,
+    ):
+        self.app = app
+        self.backend = backend or create_backend()
+        self.public_read = RatePolicy.parse("public_read", public_read)
+        self.authenticated_read = RatePolicy.parse("authenticated_read", authenticated_read)
+        self.write = RatePolicy.parse("write", write)
+        self.auth = RatePolicy.parse("auth", auth)
+        self.exempt_paths = set(exempt_paths)
+        self.trust_forwarded = trust_forwarded
+
+    def _user_id(self, headers: Headers) -> Optional[str]:
+        token = cookie_parser(headers.get("cookie", "")).get("access_token")
+        if not token:
+            scheme, _, credentials = headers.get("authorization", "").partition(" ")
+            token = credentials.strip() if scheme.lower() == "bearer" else None
+        claims = token_cache.peek(token) if token else None
+        return claims.get("sub") if claims else None
+
+    def _client_ip(self, scope, headers: Headers) -> str:
+        if self.trust_forwarded:
+            forwarded = headers.get("x-forwarded-for")
+            if forwarded:
+                return forwarded.split(",", 1)[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _policy(self, method: str, path: str, authenticated: bool) -> RatePolicy:
+        if path.startswith("/api/auth/"):
+            return self.auth
+        if method not in ("GET", "HEAD"):
+            return self.write
+        return self.authenticated_read if authenticated else self.public_read
+
+    async def __call__(self, scope, receive, send):
+        method = scope.get("method", "GET")
+        if scope["type"] != "http" or method == "OPTIONS" or scope.get("path") in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        user_id = self._user_id(headers)
+        policy = self._policy(method, scope["path"], user_id is not None)
+        client = f"sub:{user_id}" if user_id else f"ip:{self._client_ip(scope, headers)}"
+        try:
+            retry_after = await self.backend.hit(f"{policy.name}|{client}", policy)
+        except sqlite3.Error as e:
+            # Fail open - a broken limiter must not take the API down with it
+            logger.warning("Rate limit check failed, allowing request: %s", e)
+            retry_after = 0.0
+
+        if retry_after <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMIT_REJECTIONS.inc(policy.name)
+        response = JSONResponse(
+            status_code=429,
+            content={
+                "error": "Too Many Requests",
+                "message": f"Rate limit exceeded. Try again in {math.ceil(retry_after)} seconds.",
+                "status_code": 429
+            },
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+        await response(scope, receive, send)
@@ -2,13 +2,18 @@ from fastapi import APIRouter, HTTPException, Request, Response, Depends, Query,
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.responses import RedirectResponse
 from Schemas.TokenSchema import TokenRequest
-from auth import verify_token, get_token_data, security, get_or_create_profile
-from config import AUTH0_DOMAIN, AUTH0_CLIENT_ID, AUTH0_CLIENT_SECRET
-from database import get_db
+from auth import verify_token, get_token_data, security, provision_profile, token_cache
+from config import AUTH0_BASE_URL, AUTH0_CLIENT_ID, AUTH0_CLIENT_SECRET, AUTH_REFRESH_RESULT_TTL
+from logging_config import get_logger
+from metrics import AUTH0_UPSTREAM_DURATION
+from http_client import get_client
+from singleflight import SingleFlight
+import hashlib
 import httpx
-from typing import Optional
+from typing import NamedTuple, Optional
 
 router = APIRouter()
+logger = get_logger("routes.auth")
 
 @router.get("/api/auth/callback", tags=["Auth"])
 async def auth_callback(
@@ -22,10 +27,10 @@ async def auth_callback(
         )
     
     try:
-        token_url = f"https://{AUTH0_DOMAIN}/oauth/token"
+        token_url = f"{AUTH0_BASE_URL}/oauth/token"
         
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
+        with AUTH0_UPSTREAM_DURATION.time("token", "error") as timer:
+            token_response = await get_client().post(
                 token_url,
                 json={
                     "grant_type": "authorization_code",
@@ -33,9 +38,9 @@ async def auth_callback(
                     "client_secret": AUTH0_CLIENT_SECRET,
                     "code": code,
                     "redirect_uri": "http://localhost:8000/api/auth/callback"
-                },
-                timeout=10.0
+                }
             )
+            timer.labels = ("token", str(token_response.status_code))
         
         if token_response.status_code != 200:
             error_data = token_response.json() if token_response.headers.get("content-type", "").startswith("application/json") else {}
@@ -55,14 +60,14 @@ async def auth_callback(
                 detail="No access token received from Auth0"
             )
         
-        userinfo_url = f"https://{AUTH0_DOMAIN}/userinfo"
+        userinfo_url = f"{AUTH0_BASE_URL}/userinfo"
         try:
-            async with httpx.AsyncClient() as client:
-                userinfo_response = await client.get(
+            with AUTH0_UPSTREAM_DURATION.time("userinfo", "error") as timer:
+                userinfo_response = await get_client().get(
                     userinfo_url,
-                    headers={"Authorization": f"Bearer {access_token}"},
-                    timeout=10.0
+                    headers={"Authorization": f"Bearer {access_token}"}
                 )
+                timer.labels = ("userinfo", str(userinfo_response.status_code))
             
             if userinfo_response.status_code != 200:
                 verified_token = await verify_token(credentials=HTTPAuthorizationCredentials(
@@ -79,14 +84,11 @@ async def auth_callback(
             ))
             user_data = verified_token
         
-        db = next(get_db())
+        # Provisioned here, once per login - /api/profile/me then only reads
         try:
-            profile = get_or_create_profile(user_data, db)
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-        finally:
-            db.close()
+            await provision_profile(user_data)
+        except Exception:
+            logger.exception("Could not create profile during login")
         
         redirect_response = RedirectResponse(url="http://localhost:5173/")
         redirect_response.set_cookie(
@@ -122,8 +124,7 @@ async def auth_callback(
             detail="Authentication service timeout. Please try again."
         )
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Auth0 callback failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Authentication failed: {str(e)}"
@@ -132,10 +133,10 @@ async def auth_callback(
 @router.get("/api/auth/login", tags=["Auth"])
 async def login():
     """Redirect to Auth0 login"""
-    from config import AUTH0_DOMAIN, AUTH0_CLIENT_ID, AUTH0_AUDIENCE
+    from config import AUTH0_BASE_URL, AUTH0_CLIENT_ID, AUTH0_AUDIENCE
     
     auth_url = (
-        f"https://{AUTH0_DOMAIN}/authorize?"
+        f"{AUTH0_BASE_URL}/authorize?"
         f"response_type=code&"
         f"client_id={AUTH0_CLIENT_ID}&"
         f"redirect_uri=http://localhost:8000/api/auth/callback&"
@@ -200,6 +201,37 @@ async def protected_route(token_data: dict = Depends(get_token_data)):
     return {"message": "You are authenticated!", "user": token_data}
 
 
+@router.get("/api/auth/token-cache/stats", tags=["Auth"])
+async def token_cache_stats(token_data: dict = Depends(get_token_data)):
+    """Hit/miss counters of the verified-token cache for this worker"""
+    return token_cache.stats()
+
+
+class RefreshResult(NamedTuple):
+    status_code: int
+    data: dict
+
+
+# Refresh grants in flight / finished in the last AUTH_REFRESH_RESULT_TTL seconds, by refresh token hash
+refresh_flights = SingleFlight(result_ttl=AUTH_REFRESH_RESULT_TTL)
+
+
+async def _refresh_upstream(refresh_token: str) -> RefreshResult:
+    with AUTH0_UPSTREAM_DURATION.time("refresh", "error") as timer:
+        token_response = await get_client().post(
+            f"{AUTH0_BASE_URL}/oauth/token",
+            json={
+                "grant_type": "refresh_token",
+                "client_id": AUTH0_CLIENT_ID,
+                "client_secret": AUTH0_CLIENT_SECRET,
+                "refresh_token": refresh_token
+            }
+        )
+        timer.labels = ("refresh", str(token_response.status_code))
+    is_json = token_response.headers.get("content-type", "").startswith("application/json")
+    return RefreshResult(token_response.status_code, token_response.json() if is_json else {})
+
+
 @router.post("/api/auth/refresh", tags=["Auth"])
 async def refresh_token(request: Request, response: Response):
     """Refresh access token using refresh token"""
@@ -220,22 +252,13 @@ async def refresh_token(request: Request, response: Response):
         )
     
     try:
-        token_url = f"https://{AUTH0_DOMAIN}/oauth/token"
+        # Requests fired together after the access token expired all arrive with the same
+        # refresh token - they share one grant, which rotation would otherwise reject
+        token_key = hashlib.sha256(refresh_token.encode("utf-8")).hexdigest()
+        result = await refresh_flights.do(token_key, lambda: _refresh_upstream(refresh_token))
         
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                token_url,
-                json={
-                    "grant_type": "refresh_token",
-                    "client_id": AUTH0_CLIENT_ID,
-                    "client_secret": AUTH0_CLIENT_SECRET,
-                    "refresh_token": refresh_token
-                },
-                timeout=10.0
-            )
-        
-        if token_response.status_code != 200:
-            error_data = token_response.json() if token_response.headers.get("content-type", "").startswith("application/json") else {}
+        if result.status_code != 200:
+            error_data = result.data
             error_message = error_data.get("error_description", "Failed to refresh token")
             error_code = error_data.get("error", "unknown_error")
             
@@ -262,7 +285,7 @@ async def refresh_token(request: Request, response: Response):
                 detail=f"Token refresh failed: {error_message}"
             )
         
-        token_data = token_response.json()
+        token_data = result.data
         new_access_token = token_data.get("access_token")
         new_refresh_token = token_data.get("refresh_token") 
         
@@ -306,8 +329,7 @@ async def refresh_token(request: Request, response: Response):
             detail="Token refresh service timeout. Please try again."
         )
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Token refresh failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Token refresh failed: {str(e)}"
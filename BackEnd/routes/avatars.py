@@ -0,0 +1,102 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import FileResponse
+from pathlib import Path
+from typing import Optional
+import os
+import re
+from starlette.concurrency import run_in_threadpool
+from avatars import AVATAR_DIR
+
+router = APIRouter()
+
+# Processed variants: named by content hash, so a URL's bytes never change
+HASHED_NAME = re.compile(r"^(?P<hash>[0-9a-f]{32})-(?P<size>\d+)\.(?P<ext>webp|jpg|png)$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Avatars uploaded before processing existed keep their names - revalidated on every use
+REVALIDATE = "public, max-age=0, must-revalidate"
+MEDIA_TYPES = {"webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+
+
+def accepts_webp(accept: Optional[str]) -> bool:
+    """Only an explicit image/webp counts - older browsers send */* without supporting it"""
+    for media_range in (accept or "").split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        if media_type.lower() != "image/webp":
+            continue
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    return if_none_match.strip() == "*" or any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+def _stat(path: Path) -> Optional[os.stat_result]:
+    try:
+        result = path.stat()
+    except OSError:
+        return None
+    return result if path.is_file() else None
+
+
+async def _negotiate(content_hash: str, size: str, request: Request) -> tuple[Path, str, Optional[os.stat_result]]:
+    """WebP when the client accepts it, otherwise the variant's PNG/JPEG fallback"""
+    if accepts_webp(request.headers.get("accept")):
+        name = f"{content_hash}-{size}.webp"
+        stat_result = await run_in_threadpool(_stat, AVATAR_DIR / name)
+        if stat_result is not None:
+            return AVATAR_DIR / name, name, stat_result
+    for ext in ("jpg", "png"):
+        name = f"{content_hash}-{size}.{ext}"
+        stat_result = await run_in_threadpool(_stat, AVATAR_DIR / name)
+        if stat_result is not None:
+            return AVATAR_DIR / name, name, stat_result
+    return AVATAR_DIR / name, name, None
+
+
+@router.api_route("/uploads/avatars/{filename}", methods=["GET", "HEAD"], include_in_schema=False)
+async def get_avatar(filename: str, request: Request):
+    """Serve an avatar variant.
+
+    `<hash>-<size>.webp` URLs (what `avatar_url` holds) are negotiated against
+    `Accept` and fall back to the PNG/JPEG variant. The file is sent with
+    sendfile/pathsend where the server supports it, and Range requests are honoured.
+    """
+    match = HASHED_NAME.match(filename)
+    headers = {}
+    if match and match["ext"] == "webp":
+        path, name, stat_result = await _negotiate(match["hash"], match["size"], request)
+        headers["Vary"] = "Accept"
+    elif match or (filename == Path(filename).name and not filename.startswith(".")):
+        path, name = AVATAR_DIR / filename, filename
+        stat_result = await run_in_threadpool(_stat, path)
+    else:
+        stat_result = None
+    if stat_result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Avatar not found")
+
+    if match:
+        # Strong: the name is derived from the content, and variants are never re-encoded in place
+        etag = f'"{name}"'
+        headers["Cache-Control"] = IMMUTABLE
+    else:
+        etag = f'"{stat_result.st_size:x}-{int(stat_result.st_mtime):x}"'
+        headers["Cache-Control"] = REVALIDATE
+    headers["ETag"] = etag
+
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    media_type = MEDIA_TYPES.get(name.rsplit(".", 1)[-1])
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
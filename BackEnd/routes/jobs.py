@@ -1,26 +1,39 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from database import get_async_db, get_async_read_db
 from Models.JobModel import Job
-from Schemas.JobSchema import JobsCreate, JobsResponse
+from Schemas.JobSchema import JobsCreate, JobsUpdate, JobsResponse
+from Schemas.BulkSchema import BulkRequest, BulkResponse
 from auth import get_token_data, get_user_id_from_token
+from profile_cache import profile_cache
+from bulk import apply_bulk
+from pagination import PageParams, paginate
+from http_cache import check_profile_version
+from serializers import json_response
 
 router = APIRouter()
 
 @router.get("/api/jobs", response_model=List[JobsResponse], tags=["Jobs"])
 async def get_jobs(
+    request: Request,
+    response: Response,
     profile_id: str = Query(..., description="Profile ID to get jobs for"),
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     token_data: dict = Depends(get_token_data)
 ):
-    jobs = db.query(Job).filter(Job.profile_id == profile_id).all()
-    return jobs
+    not_modified = await check_profile_version(request, response, db, profile_id)
+    if not_modified:
+        return not_modified
+    items = await paginate(db, select(Job).where(Job.profile_id == profile_id), (Job.id,), page, response)
+    return json_response(List[JobsResponse], items, response)
 
 @router.post("/api/jobs", response_model=JobsResponse, tags=["Jobs"])
 async def create_job(
     job: JobsCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     user_id = get_user_id_from_token(token_data)
@@ -31,49 +44,62 @@ async def create_job(
         description=job.description
     )
     db.add(db_job)
-    db.commit()
-    db.refresh(db_job)
-    return db_job
+    await db.commit()
+    await db.refresh(db_job)
+    profile_cache.invalidate(db_job.profile_id)
+    return json_response(JobsResponse, db_job)
 
 
 @router.get("/api/jobs/{job_id}", response_model=JobsResponse, tags=["Jobs"])
 async def get_job_by_id(
     job_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    db_job = db.query(Job).filter(Job.id == job_id).first()
+    db_job = await db.get(Job, job_id)
     if not db_job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return db_job
+    return json_response(JobsResponse, db_job)
 
 @router.put("/api/jobs/{job_id}", response_model=JobsResponse, tags=["Jobs"])
 async def update_job(
     job_id: int,
     job: JobsCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_job = db.query(Job).filter(Job.id == job_id).first()
+    db_job = await db.get(Job, job_id)
     if not db_job:
         raise HTTPException(status_code=404, detail="Job not found")
     
     db_job.title = job.title
     db_job.description = job.description
     
-    db.commit()
-    db.refresh(db_job)
-    return db_job
+    await db.commit()
+    await db.refresh(db_job)
+    profile_cache.invalidate(db_job.profile_id)
+    return json_response(JobsResponse, db_job)
 
 @router.delete("/api/jobs/{job_id}", tags=["Jobs"])
 async def delete_job(
     job_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_job = db.query(Job).filter(Job.id == job_id).first()
+    db_job = await db.get(Job, job_id)
     if not db_job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    db.delete(db_job)
-    db.commit()
+    await db.delete(db_job)
+    await db.commit()
+    profile_cache.invalidate(db_job.profile_id)
     return {"message": "Job deleted"}
+
+@router.post("/api/jobs/bulk", response_model=BulkResponse[JobsResponse], tags=["Jobs"])
+async def bulk_jobs(
+    batch: BulkRequest[JobsCreate, JobsUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    token_data: dict = Depends(get_token_data)
+):
+    """Create, update and delete several of the current user's jobs in one transaction"""
+    user_id = get_user_id_from_token(token_data)
+    return json_response(BulkResponse[JobsResponse], await apply_bulk(db, Job, user_id, batch))
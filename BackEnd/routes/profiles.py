@@ -1,74 +1,152 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, status
-from sqlalchemy.orm import Session, joinedload
-from pathlib import Path
-import shutil
-import uuid
-import os
-from database import get_db
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
+from database import get_async_db, get_async_read_db, AsyncSessionLocal, AsyncReadSessionLocal
 from Models.ProfileModel import Profile
-from Schemas.ProfileSchema import ProfileCreate, ProfileResponse
-from auth import get_token_data, get_user_id_from_token, get_user_email_from_token, get_or_create_profile
+from Schemas.ProfileSchema import ProfileCreate, ProfileResponse, PROFILE_FIELDS, PROFILE_RELATIONSHIPS, sparse_profile_model
+from auth import get_token_data, get_user_id_from_token, get_user_email_from_token, get_or_create_profile, load_profile_with_children, known_profiles
+from profile_cache import profile_cache, CachedProfile
+from http_cache import ProfileVersion, get_profile_version, is_not_modified, not_modified_response, cache_headers
+from logging_config import get_logger
+from uploads import receive_file
+from compression import negotiate_encoding, precompress
+from serializers import dump_json, json_response
+from starlette.concurrency import run_in_threadpool
+from avatars import AVATAR_DIR, InvalidAvatar, ensure_variants, process_upload, release_avatar
 
 router = APIRouter()
+logger = get_logger("routes.profiles")
 
 # Allowed image extensions
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
 # IMPORTANT: More specific routes must come FIRST
-@router.get("/api/profile/me", response_model=ProfileResponse, tags=["Profiles"])
-async def get_my_profile(
+@router.get("/api/profile/me/full", response_model=ProfileResponse, tags=["Profiles"])
+async def get_my_dashboard(
     token_data: dict = Depends(get_token_data),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get current user's profile - auto-creates if doesn't exist"""
+    """Dashboard payload: current user's profile with all projects, jobs, services and social links.
+    
+    One token check and a fixed five queries (profile + one per collection) on a read connection,
+    instead of a request per collection. Provisions the profile on first use (see auth.provision_profile).
+    """
     try:
-        profile = get_or_create_profile(token_data, db)
-        print(f"🔍 Profile: {profile}")
-        return profile
-        
+        return json_response(ProfileResponse, await get_or_create_profile(token_data, db))
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Invalid user data: {str(e)}"
         )
     except Exception as e:
-        print(f"❌ Error getting profile: {e}")
+        logger.exception("Error getting dashboard")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get profile: {str(e)}"
         )
 
+@router.get("/api/profile/me", response_model=ProfileResponse, tags=["Profiles"])
+async def get_my_profile(
+    token_data: dict = Depends(get_token_data),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Get current user's profile - auto-creates if doesn't exist.
+    
+    Compatibility path for clients written before /api/profile/me/full; returns the same payload.
+    """
+    return await get_my_dashboard(token_data, db)
+
+async def build_public_profile(profile_id: str) -> Optional[CachedProfile]:
+    """Load a profile with all related data and serialize it - used to fill the profile cache"""
+    async with AsyncReadSessionLocal() as db:
+        # One query per collection (selectinload) - joinedload on all four would return
+        # the cartesian product of jobs x services x projects x social_links
+        profile = await load_profile_with_children(db, profile_id)
+        if not profile:
+            return None
+        body = dump_json(ProfileResponse, profile)
+        return CachedProfile(body, profile.version, profile.updated_at, profile.created_at, **await run_in_threadpool(precompress, body))
+
+async def build_sparse_profile(profile_id: str, fields: Tuple[str, ...], include: Tuple[str, ...]) -> Optional[CachedProfile]:
+    """Like build_public_profile, but loads and serializes only the requested columns and relationships"""
+    async with AsyncReadSessionLocal() as db:
+        profile = await load_profile_with_children(
+            db, profile_id, relationships=include, columns=fields + ("version", "updated_at", "created_at")
+        )
+        if not profile:
+            return None
+        body = dump_json(sparse_profile_model(fields, include), profile)
+        return CachedProfile(body, profile.version, profile.updated_at, profile.created_at, **await run_in_threadpool(precompress, body))
+
+def _parse_parts(value: Optional[str], allowed: Tuple[str, ...], param: str) -> Tuple[str, ...]:
+    """Comma separated names -> tuple in canonical order; a missing parameter means all of them"""
+    if value is None:
+        return allowed
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = sorted(names - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {param}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}"
+        )
+    return tuple(name for name in allowed if name in names)
+
 # Then the parameterized route
 @router.get("/api/profile/{profile_id}", response_model=ProfileResponse, tags=["Profiles"])
 async def get_profile(
+    request: Request,
     profile_id: str,
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description=f"Profile columns to return (id is always included): {', '.join(PROFILE_FIELDS)}"),
+    include: Optional[str] = Query(None, description=f"Related collections to return, empty for none: {', '.join(PROFILE_RELATIONSHIPS)}")
 ):
-    """Get profile by ID - public endpoint, no authentication required. Returns profile with all related data."""
+    """Get profile by ID - public endpoint, no authentication required. Returns profile with all related data,
+    or only the parts selected with `fields` / `include`. Supports If-None-Match / If-Modified-Since."""
     try:
-        # Use joinedload to eagerly load all relationships
-        profile = db.query(Profile)\
-            .options(
-                joinedload(Profile.jobs),
-                joinedload(Profile.services),
-                joinedload(Profile.projects),
-                joinedload(Profile.social_links)
-            )\
-            .filter(Profile.id == profile_id)\
-            .first()
+        selected_fields = _parse_parts(fields, PROFILE_FIELDS, "fields")
+        selected_include = _parse_parts(include, PROFILE_RELATIONSHIPS, "include")
         
-        if not profile:
+        # Revalidation needs only the version - the profile itself is loaded (or taken from the cache) when changed
+        async with AsyncReadSessionLocal() as db:
+            current = await get_profile_version(db, profile_id)
+        if current is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Profile with ID '{profile_id}' not found"
             )
+        if is_not_modified(request, current):
+            return not_modified_response(current)
+        
+        # Served from the in-process cache; concurrent misses share a single rebuild.
+        # min_version drops entries made stale by writes handled in other workers.
+        if selected_fields == PROFILE_FIELDS and selected_include == PROFILE_RELATIONSHIPS:
+            cached = await profile_cache.get_or_build(profile_id, build_public_profile, min_version=current.version)
+        else:
+            cached = await profile_cache.get_or_build(
+                profile_id,
+                lambda pid: build_sparse_profile(pid, selected_fields, selected_include),
+                variant=f"fields={','.join(selected_fields)}&include={','.join(selected_include)}",
+                min_version=current.version
+            )
         
-        return profile
+        if cached is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Profile with ID '{profile_id}' not found"
+            )
+        
+        # Compressed when cached - the compression middleware passes encoded responses through
+        headers = cache_headers(ProfileVersion(cached.version, cached.updated_at, cached.created_at))
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        body = cached.encoded(encoding)
+        headers["Vary"] = "Accept-Encoding"
+        if body is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body if body is not None else cached.body, media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error getting profile: {e}")
+        logger.exception("Error getting profile")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to get profile: {str(e)}"
@@ -76,7 +154,7 @@ async def get_profile(
 
 @router.get("/api/profile", tags=["Profiles"])
 async def get_profile_root(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     """Redirect to /api/profile/me - handles trailing slash redirects"""
@@ -86,14 +164,14 @@ async def get_profile_root(
 @router.post("/api/profile", response_model=ProfileResponse, tags=["Profiles"])
 async def create_profile(
     profile: ProfileCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     try:
         user_id = get_user_id_from_token(token_data)
         
         # Check if profile already exists
-        existing = db.query(Profile).filter(Profile.id == user_id).first()
+        existing = await db.get(Profile, user_id)
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -110,14 +188,14 @@ async def create_profile(
             phone=profile.phone
         )
         db.add(db_profile)
-        db.commit()
-        db.refresh(db_profile)
-        return db_profile
+        await db.commit()
+        profile_cache.invalidate(user_id)
+        return json_response(ProfileResponse, await load_profile_with_children(db, user_id))
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ Error creating profile: {e}")
+        await db.rollback()
+        logger.exception("Error creating profile")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create profile: {str(e)}"
@@ -127,7 +205,7 @@ async def create_profile(
 async def update_profile(
     profile_id: str,
     profile: ProfileCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     try:
@@ -138,7 +216,7 @@ async def update_profile(
                 detail="You are not authorized to update this profile"
             )
         
-        db_profile = db.query(Profile).filter(Profile.id == profile_id).first()
+        db_profile = await db.get(Profile, profile_id)
         if not db_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -151,14 +229,14 @@ async def update_profile(
         db_profile.phone = profile.phone
         db_profile.email = profile.email  # Add this line to update the email
         
-        db.commit()
-        db.refresh(db_profile)
-        return db_profile
+        await db.commit()
+        profile_cache.invalidate(profile_id)
+        return json_response(ProfileResponse, await load_profile_with_children(db, profile_id))
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ Error updating profile: {e}")
+        await db.rollback()
+        logger.exception("Error updating profile")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update profile: {str(e)}"
@@ -167,7 +245,7 @@ async def update_profile(
 @router.delete("/api/profile/{profile_id}", tags=["Profiles"])
 async def delete_profile(
     profile_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     """Delete profile - only user can delete their own profile"""
@@ -179,43 +257,53 @@ async def delete_profile(
                 detail="You are not authorized to delete this profile"
             )
         
-        db_profile = db.query(Profile).filter(Profile.id == profile_id).first()
+        db_profile = await db.get(Profile, profile_id)
         if not db_profile:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Profile with ID '{profile_id}' not found"
             )
         
-        # Delete avatar file if exists
-        if db_profile.avatar_url:
-            try:
-                avatar_path = db_profile.avatar_url.replace("http://localhost:8000/", "")
-                if os.path.exists(avatar_path):
-                    os.remove(avatar_path)
-            except Exception as e:
-                print(f"⚠️ Warning: Could not delete avatar file: {e}")
+        avatar_url = db_profile.avatar_url
+        await db.delete(db_profile)
+        await db.commit()
+        profile_cache.invalidate(profile_id)
+        known_profiles.discard(profile_id)
         
-        db.delete(db_profile)
-        db.commit()
+        # Delete avatar files if no other profile shares them
+        try:
+            await release_avatar(db, avatar_url, AVATAR_DIR)
+        except Exception as e:
+            logger.warning("Could not delete avatar file: %s", e)
         return {"message": "Profile deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ Error deleting profile: {e}")
+        await db.rollback()
+        logger.exception("Error deleting profile")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete profile: {str(e)}"
         )
 
-@router.post("/api/profile/{profile_id}/avatar", tags=["Profiles"])
+AVATAR_UPLOAD_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
+@router.post("/api/profile/{profile_id}/avatar", tags=["Profiles"], openapi_extra=AVATAR_UPLOAD_SCHEMA)
 async def upload_avatar(
     profile_id: str,
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    request: Request,
     token_data: dict = Depends(get_token_data)
 ):
-    """Upload avatar image - saves to local storage"""
+    """Upload avatar image - streamed to disk, then stored as resized variants (see avatars.py)"""
     try:
         # Decode URL-encoded profile_id (handles %7C -> |)
         from urllib.parse import unquote
@@ -223,103 +311,63 @@ async def upload_avatar(
         
         user_id = get_user_id_from_token(token_data)
         
-        print(f"🔍 Avatar upload - profile_id: {profile_id}, user_id: {user_id}")
-        
         if profile_id != user_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You are not authorized to upload avatar for this profile"
             )
         
-        db_profile = db.query(Profile).filter(Profile.id == profile_id).first()
-        if not db_profile:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Profile with ID '{profile_id}' not found"
-            )
+        # Short read before the upload - no connection is held while the body streams in
+        async with AsyncReadSessionLocal() as db:
+            if await get_profile_version(db, profile_id) is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Profile with ID '{profile_id}' not found"
+                )
         
-        # Validate file extension
-        if not file.filename:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No filename provided"
-            )
+        # Rejected from Content-Length, the file extension or the received byte count, whichever fails first
+        upload = await receive_file(request, "file", AVATAR_DIR, MAX_FILE_SIZE, ALLOWED_EXTENSIONS)
         
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Invalid file type. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
-        
-        # Read file content
-        contents = await file.read()
-        
-        # Validate file size
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large. Maximum size is {MAX_FILE_SIZE / (1024*1024):.1f}MB"
-            )
-        
-        # Create uploads directory if it doesn't exist (use absolute path for Windows)
-        upload_dir = Path("uploads/avatars").resolve()
-        upload_dir.mkdir(parents=True, exist_ok=True)
-        
-        print(f"📁 Upload directory: {upload_dir}")
-        
-        # Generate unique filename: user_id + uuid + extension
-        # Replace | with _ in filename for filesystem compatibility
-        safe_user_id = profile_id.replace("|", "_").replace("/", "_").replace("\\", "_")
-        unique_filename = f"{safe_user_id}_{uuid.uuid4().hex[:8]}{file_ext}"
-        file_path = upload_dir / unique_filename
-        
-        print(f"💾 Saving file to: {file_path}")
-        
-        # Delete old avatar if exists
-        if db_profile.avatar_url:
+        # Checked by magic bytes, stripped of metadata and resized in the avatar process pool.
+        # Variants are named by content hash; the upload itself is only kept until the profile is updated.
+        try:
             try:
-                # Extract filename from URL
+                avatar = await process_upload(upload.temp_path, AVATAR_DIR)
+            except InvalidAvatar as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            logger.debug("Processed avatar %s (%d bytes uploaded)", avatar.content_hash, upload.size)
+            
+            # Update profile with new avatar URL
+            avatar_url = f"http://localhost:8000/uploads/avatars/{avatar.filename()}"
+            async with AsyncSessionLocal() as db:
+                db_profile = await db.get(Profile, profile_id)
+                if not db_profile:
+                    await release_avatar(db, avatar_url, AVATAR_DIR)
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Profile with ID '{profile_id}' not found"
+                    )
                 old_url = db_profile.avatar_url
-                if "uploads/avatars/" in old_url:
-                    old_filename = old_url.split("uploads/avatars/")[-1]
-                    old_path = upload_dir / old_filename
-                    if old_path.exists():
-                        old_path.unlink()
-                        print(f"🗑️ Deleted old avatar: {old_filename}")
-            except Exception as e:
-                print(f"⚠️ Warning: Could not delete old avatar: {e}")
-        
-        # Save file
-        try:
-            with open(file_path, "wb") as f:
-                f.write(contents)
-            print(f"✅ File saved successfully: {file_path}")
-        except Exception as e:
-            print(f"❌ Error saving file: {e}")
-            import traceback
-            traceback.print_exc()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to save file: {str(e)}"
-            )
-        
-        # Update profile with new avatar URL
-        avatar_url = f"http://localhost:8000/uploads/avatars/{unique_filename}"
-        db_profile.avatar_url = avatar_url
-        db.commit()
-        db.refresh(db_profile)
-        
-        print(f"✅ Avatar URL updated: {avatar_url}")
+                db_profile.avatar_url = avatar_url
+                await db.commit()
+                profile_cache.invalidate(profile_id)
+                # Reused files of an identical image may have been released before our commit landed
+                await ensure_variants(upload.temp_path, AVATAR_DIR, avatar)
+                
+                # Delete the old avatar only once the new one is committed (and if no other profile shares it)
+                if old_url and old_url != avatar_url:
+                    try:
+                        await release_avatar(db, old_url, AVATAR_DIR)
+                    except Exception as e:
+                        logger.warning("Could not delete old avatar: %s", e)
+        finally:
+            await upload.discard()
         
         return {"avatarUrl": avatar_url, "message": "Avatar uploaded successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        print(f"❌ Error uploading avatar: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error uploading avatar")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to upload avatar: {str(e)}"
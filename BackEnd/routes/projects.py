@@ -1,38 +1,61 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from database import get_async_db, get_async_read_db
 from Models.ProjectModel import Project
-from Schemas.ProjectSchema import ProjectCreate, ProjectResponse
+from Schemas.ProjectSchema import ProjectCreate, ProjectUpdate, ProjectResponse
+from Schemas.BulkSchema import BulkRequest, BulkResponse
 from auth import get_token_data, get_user_id_from_token
+from profile_cache import profile_cache
+from bulk import apply_bulk
+from pagination import PageParams, paginate
+from http_cache import check_profile_version
+from serializers import json_response
 
 router = APIRouter()
 
 # Get projects by profile_id - use query parameter to avoid conflict
 @router.get("/api/projects", response_model=List[ProjectResponse], tags=["Projects"])
 async def get_projects(
+    request: Request,
+    response: Response,
     profile_id: str = Query(..., description="Profile ID to get projects for"),
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     token_data: dict = Depends(get_token_data)
 ):
-    projects = db.query(Project).filter(Project.profile_id == profile_id).order_by(Project.sort_order).all()
-    return projects
+    not_modified = await check_profile_version(request, response, db, profile_id)
+    if not_modified:
+        return not_modified
+    items = await paginate(
+        db, select(Project).where(Project.profile_id == profile_id), (Project.sort_order, Project.id), page, response
+    )
+    return json_response(List[ProjectResponse], items, response)
 
 # Get current user's projects - convenience endpoint
 @router.get("/api/projects/me", response_model=List[ProjectResponse], tags=["Projects"])
 async def get_my_projects(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     token_data: dict = Depends(get_token_data)
 ):
-    """Get all projects for the current authenticated user"""
+    """Get the projects of the current authenticated user"""
     user_id = get_user_id_from_token(token_data)
-    projects = db.query(Project).filter(Project.profile_id == user_id).order_by(Project.sort_order).all()
-    return projects
+    not_modified = await check_profile_version(request, response, db, user_id)
+    if not_modified:
+        return not_modified
+    items = await paginate(
+        db, select(Project).where(Project.profile_id == user_id), (Project.sort_order, Project.id), page, response
+    )
+    return json_response(List[ProjectResponse], items, response)
 
 @router.post("/api/projects", response_model=ProjectResponse, tags=["Projects"])
 async def create_project(
     project: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     user_id = get_user_id_from_token(token_data)
@@ -45,31 +68,32 @@ async def create_project(
         sort_order=project.sort_order or 0
     )
     db.add(db_project)
-    db.commit()
-    db.refresh(db_project)
-    return db_project
+    await db.commit()
+    await db.refresh(db_project)
+    profile_cache.invalidate(db_project.profile_id)
+    return json_response(ProjectResponse, db_project)
 
 # Get single project by ID - this route now works correctly
 @router.get("/api/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"])
 async def get_project_by_id(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     token_data: dict = Depends(get_token_data)
 ):
     """Get a single project by its ID"""
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return db_project
+    return json_response(ProjectResponse, db_project)
 
 @router.put("/api/projects/{project_id}", response_model=ProjectResponse, tags=["Projects"])
 async def update_project(
     project_id: int,
     project: ProjectCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
     
@@ -78,20 +102,32 @@ async def update_project(
     db_project.project_link = project.project_link
     db_project.sort_order = project.sort_order or 0
     
-    db.commit()
-    db.refresh(db_project)
-    return db_project
+    await db.commit()
+    await db.refresh(db_project)
+    profile_cache.invalidate(db_project.profile_id)
+    return json_response(ProjectResponse, db_project)
 
 @router.delete("/api/projects/{project_id}", tags=["Projects"])
 async def delete_project(
     project_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_project = db.query(Project).filter(Project.id == project_id).first()
+    db_project = await db.get(Project, project_id)
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    db.delete(db_project)
-    db.commit()
+    await db.delete(db_project)
+    await db.commit()
+    profile_cache.invalidate(db_project.profile_id)
     return {"message": "Project deleted"}
+
+@router.post("/api/projects/bulk", response_model=BulkResponse[ProjectResponse], tags=["Projects"])
+async def bulk_projects(
+    batch: BulkRequest[ProjectCreate, ProjectUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    token_data: dict = Depends(get_token_data)
+):
+    """Create, update and delete several of the current user's projects in one transaction"""
+    user_id = get_user_id_from_token(token_data)
+    return json_response(BulkResponse[ProjectResponse], await apply_bulk(db, Project, user_id, batch))
@@ -1,26 +1,41 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from database import get_async_db, get_async_read_db
 from Models.ServiceModel import Service
-from Schemas.ServiceSchema import ServiceCreate, ServiceResponse
+from Schemas.ServiceSchema import ServiceCreate, ServiceUpdate, ServiceResponse
+from Schemas.BulkSchema import BulkRequest, BulkResponse
 from auth import get_token_data, get_user_id_from_token
+from profile_cache import profile_cache
+from bulk import apply_bulk
+from pagination import PageParams, paginate
+from http_cache import check_profile_version
+from serializers import json_response
 
 router = APIRouter()
 
 @router.get("/api/services", response_model=List[ServiceResponse], tags=["Services"])
 async def get_services(
+    request: Request,
+    response: Response,
     profile_id: str = Query(..., description="Profile ID to get services for"),
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     token_data: dict = Depends(get_token_data)
 ):
-    services = db.query(Service).filter(Service.profile_id == profile_id).order_by(Service.sort_order).all()
-    return services
+    not_modified = await check_profile_version(request, response, db, profile_id)
+    if not_modified:
+        return not_modified
+    items = await paginate(
+        db, select(Service).where(Service.profile_id == profile_id), (Service.sort_order, Service.id), page, response
+    )
+    return json_response(List[ServiceResponse], items, response)
 
 @router.post("/api/services", response_model=ServiceResponse, tags=["Services"])
 async def create_service(
     service: ServiceCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     user_id = get_user_id_from_token(token_data)
@@ -32,28 +47,29 @@ async def create_service(
         sort_order=service.sort_order or 0
     )
     db.add(db_service)
-    db.commit()
-    db.refresh(db_service)
-    return db_service
+    await db.commit()
+    await db.refresh(db_service)
+    profile_cache.invalidate(db_service.profile_id)
+    return json_response(ServiceResponse, db_service)
 
 @router.get("/api/services/{service_id}", response_model=ServiceResponse, tags=["Services"])
 async def get_service_by_id(
     service_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    db_service = db.query(Service).filter(Service.id == service_id).first()
+    db_service = await db.get(Service, service_id)
     if not db_service:
         raise HTTPException(status_code=404, detail="Service not found")
-    return db_service
+    return json_response(ServiceResponse, db_service)
 
 @router.put("/api/services/{service_id}", response_model=ServiceResponse, tags=["Services"])
 async def update_service(
     service_id: int,
     service: ServiceCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_service = db.query(Service).filter(Service.id == service_id).first()
+    db_service = await db.get(Service, service_id)
     if not db_service:
         raise HTTPException(status_code=404, detail="Service not found")
     
@@ -61,20 +77,32 @@ async def update_service(
     db_service.description = service.description
     db_service.sort_order = service.sort_order or 0
     
-    db.commit()
-    db.refresh(db_service)
-    return db_service
+    await db.commit()
+    await db.refresh(db_service)
+    profile_cache.invalidate(db_service.profile_id)
+    return json_response(ServiceResponse, db_service)
 
 @router.delete("/api/services/{service_id}", tags=["Services"])
 async def delete_service(
     service_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_service = db.query(Service).filter(Service.id == service_id).first()
+    db_service = await db.get(Service, service_id)
     if not db_service:
         raise HTTPException(status_code=404, detail="Service not found")
     
-    db.delete(db_service)
-    db.commit()
+    await db.delete(db_service)
+    await db.commit()
+    profile_cache.invalidate(db_service.profile_id)
     return {"message": "Service deleted"}
+
+@router.post("/api/services/bulk", response_model=BulkResponse[ServiceResponse], tags=["Services"])
+async def bulk_services(
+    batch: BulkRequest[ServiceCreate, ServiceUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    token_data: dict = Depends(get_token_data)
+):
+    """Create, update and delete several of the current user's services in one transaction"""
+    user_id = get_user_id_from_token(token_data)
+    return json_response(BulkResponse[ServiceResponse], await apply_bulk(db, Service, user_id, batch))
@@ -1,37 +1,52 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from database import get_db
+from database import get_async_db, get_async_read_db
 from Models.SocialLinkModel import SocialLink
-from Schemas.SocialLinksSchema import SocialLinkCreate, SocialLinkResponse
+from Schemas.SocialLinksSchema import SocialLinkCreate, SocialLinkUpdate, SocialLinkResponse
+from Schemas.BulkSchema import BulkRequest, BulkResponse
 from auth import get_token_data, get_user_id_from_token
+from profile_cache import profile_cache
+from bulk import apply_bulk
+from pagination import PageParams, paginate
+from http_cache import check_profile_version
+from serializers import json_response
 
 router = APIRouter()
 
 # Remove trailing slash to match frontend calls
 @router.get("/api/social-links", response_model=List[SocialLinkResponse], tags=["Social Links"])
 async def get_social_links(
+    request: Request,
+    response: Response,
     profile_id: str = Query(..., description="Profile ID to get social links for"),
-    db: Session = Depends(get_db),
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_read_db),
     token_data: dict = Depends(get_token_data)
 ):
-    links = db.query(SocialLink).filter(SocialLink.profile_id == profile_id).all()
-    return links
+    not_modified = await check_profile_version(request, response, db, profile_id)
+    if not_modified:
+        return not_modified
+    items = await paginate(
+        db, select(SocialLink).where(SocialLink.profile_id == profile_id), (SocialLink.id,), page, response
+    )
+    return json_response(List[SocialLinkResponse], items, response)
 
 @router.get("/api/social-links/{link_id}", response_model=SocialLinkResponse, tags=["Social Links"])
 async def get_social_link_by_id(
     link_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    db_link = db.query(SocialLink).filter(SocialLink.id == link_id).first()
+    db_link = await db.get(SocialLink, link_id)
     if not db_link:
         raise HTTPException(status_code=404, detail="Social link not found")
-    return db_link
+    return json_response(SocialLinkResponse, db_link)
 
 @router.post("/api/social-links", response_model=SocialLinkResponse, tags=["Social Links"])
 async def create_social_link(
     link: SocialLinkCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
     user_id = get_user_id_from_token(token_data)
@@ -41,38 +56,51 @@ async def create_social_link(
         url=link.url
     )
     db.add(db_link)
-    db.commit()
-    db.refresh(db_link)
-    return db_link
+    await db.commit()
+    await db.refresh(db_link)
+    profile_cache.invalidate(db_link.profile_id)
+    return json_response(SocialLinkResponse, db_link)
 
 @router.put("/api/social-links/{link_id}", response_model=SocialLinkResponse, tags=["Social Links"])
 async def update_social_link(
     link_id: int,
     link: SocialLinkCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_link = db.query(SocialLink).filter(SocialLink.id == link_id).first()
+    db_link = await db.get(SocialLink, link_id)
     if not db_link:
         raise HTTPException(status_code=404, detail="Social link not found")
     
     db_link.platform = link.platform
     db_link.url = link.url
     
-    db.commit()
-    db.refresh(db_link)
-    return db_link
+    await db.commit()
+    await db.refresh(db_link)
+    profile_cache.invalidate(db_link.profile_id)
+    return json_response(SocialLinkResponse, db_link)
 
 @router.delete("/api/social-links/{link_id}", tags=["Social Links"])
 async def delete_social_link(
     link_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token_data: dict = Depends(get_token_data)
 ):
-    db_link = db.query(SocialLink).filter(SocialLink.id == link_id).first()
+    db_link = await db.get(SocialLink, link_id)
     if not db_link:
         raise HTTPException(status_code=404, detail="Social link not found")
     
-    db.delete(db_link)
-    db.commit()
+    await db.delete(db_link)
+    await db.commit()
+    profile_cache.invalidate(db_link.profile_id)
     return {"message": "Social link deleted"}
+
+@router.post("/api/social-links/bulk", response_model=BulkResponse[SocialLinkResponse], tags=["Social Links"])
+async def bulk_social_links(
+    batch: BulkRequest[SocialLinkCreate, SocialLinkUpdate],
+    db: AsyncSession = Depends(get_async_db),
+    token_data: dict = Depends(get_token_data)
+):
+    """Create, update and delete several of the current user's social links in one transaction"""
+    user_id = get_user_id_from_token(token_data)
+    return json_response(BulkResponse[SocialLinkResponse], await apply_bulk(db, SocialLink, user_id, batch))
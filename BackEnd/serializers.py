@@ -0,0 +1,49 @@
+"""Fast JSON serialization of ORM rows.
+
+`json_response()` turns ORM objects into response bytes with a Pydantic
+TypeAdapter built once per response type: one validation pass reads the
+attributes (from_attributes), and pydantic-core writes JSON bytes directly - no
+intermediate dict, no `json.dumps`. Routes keep `response_model` for the
+OpenAPI schema and return the serialized Response themselves.
+
+`ORJSONResponse` is the app's default response class for everything else
+(plain dicts such as `{"message": ...}`); it falls back to the standard json
+module when orjson isn't installed.
+"""
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # optional - stdlib json
+    orjson = None
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def get_adapter(response_type: Any) -> TypeAdapter:
+    """TypeAdapter for a response type (e.g. ProjectResponse, List[JobsResponse]), built on first use"""
+    return TypeAdapter(response_type)
+
+
+def dump_json(response_type: Any, value: Any) -> bytes:
+    adapter = get_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def json_response(response_type: Any, value: Any, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """Serialize `value` as `response_type`; headers set on the endpoint's injected `response` are kept"""
+    serialized = Response(content=dump_json(response_type, value), status_code=status_code, media_type="application/json")
+    if response is not None:
+        serialized.headers.raw.extend(response.headers.raw)
+    return serialized
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_MISSING = object()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into a single execution.
+
+    The first caller starts the work as a task; callers arriving while it runs
+    await the same task. A cancelled caller (e.g. client disconnect) does not
+    cancel the shared work for everyone else.
+
+    With `result_ttl`, a successful result is also handed to callers arriving
+    up to that many seconds after the work finished. Exceptions are never kept.
+    """
+
+    def __init__(self, result_ttl: float = 0):
+        self.result_ttl = result_ttl
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        # key -> (expires_at, result); same TTL for all, so insertion order is expiry order
+        self._results: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        if self.result_ttl > 0:
+            result = self._recent_result(key)
+            if result is not _MISSING:
+                return result
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _recent_result(self, key: Hashable) -> Any:
+        now = time.monotonic()
+        while self._results:
+            oldest_key, (expires_at, _) = next(iter(self._results.items()))
+            if expires_at > now:
+                break
+            del self._results[oldest_key]
+        entry = self._results.get(key)
+        return _MISSING if entry is None else entry[1]
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if task.cancelled():
+            return
+        # Retrieving the exception also marks it handled when every waiter went away
+        if task.exception() is None and self.result_ttl > 0:
+            self._results.pop(key, None)
+            self._results[key] = (time.monotonic() + self.result_ttl, task.result())
+
+    def in_flight(self) -> int:
+        return len(self._calls)
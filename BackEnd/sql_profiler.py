@@ -0,0 +1,122 @@
+"""Opt-in per-request SQL instrumentation (SQL_PROFILING=true).
+
+- counts statements and DB time per request (X-DB-Query-Count / X-DB-Time-Ms
+  response headers when DEBUG=true)
+- flags statement shapes repeated within one request as likely N+1 patterns
+- logs statements slower than SQL_SLOW_QUERY_MS together with their query plan
+"""
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SQL_SLOW_QUERY_MS, SQL_N_PLUS_ONE_THRESHOLD, DEBUG
+from logging_config import get_logger
+
+logger = get_logger("sql")
+
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s")  # asyncpg / psycopg2 placeholders
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeated executions with different parameters compare equal"""
+    shape = _PARAM.sub("?", statement)
+    shape = _IN_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class RequestSqlStats:
+    def __init__(self):
+        self.statements = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statements += 1
+        self.total_time += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+_stats_var: ContextVar[Optional[RequestSqlStats]] = ContextVar("sql_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["sql_profiler_start"].pop()
+
+    stats = _stats_var.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= SQL_SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s\nPlan:\n%s",
+            elapsed * 1000, statement, _explain(conn, statement, parameters, executemany)
+        )
+
+
+def _explain(conn, statement: str, parameters, executemany: bool) -> str:
+    """Query plan of a slow statement, fetched on a separate cursor so the original results are untouched"""
+    if executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        return "  (not explained)"
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join("  " + " | ".join(str(col) for col in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"  (EXPLAIN failed: {e})"
+    finally:
+        cursor.close()
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class SqlProfilerMiddleware:
+    """ASGI middleware collecting SQL stats per request; reports likely N+1 patterns when it ends"""
+
+    def __init__(self, app, expose_headers: bool = DEBUG, n_plus_one_threshold: int = SQL_N_PLUS_ONE_THRESHOLD):
+        self.app = app
+        self.expose_headers = expose_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestSqlStats()
+        token = _stats_var.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start" and self.expose_headers:
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-query-count", str(stats.statements).encode()),
+                    (b"x-db-time-ms", f"{stats.total_time * 1000:.2f}".encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _stats_var.reset(token)
+            for shape, count in stats.repeated_shapes(self.n_plus_one_threshold):
+                logger.warning(
+                    "Possible N+1 on %s %s: statement ran %d times: %s",
+                    scope.get("method"), scope.get("path"), count, shape[:500]
+                )
@@ -0,0 +1,150 @@
+"""Streaming multipart uploads.
+
+The request body is parsed as it arrives and the file part is written to a
+temporary file next to its final location, so memory per upload is bounded by
+UPLOAD_CHUNK_SIZE rather than the file size. Oversized uploads are rejected from
+Content-Length before reading, or as soon as the received bytes cross the
+limit. All filesystem calls run in the threadpool, off the event loop.
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Collection, Optional
+
+from fastapi import HTTPException, Request, status
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from config import UPLOAD_CHUNK_SIZE
+
+# Allowance for multipart boundaries and part headers when checking Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+class StreamedUpload:
+    """A file part received into a temporary file; `discard()` removes it once processed"""
+
+    def __init__(self, temp_path: Path, filename: str, size: int):
+        self.temp_path = temp_path
+        self.filename = filename
+        self.size = size
+
+    async def discard(self) -> None:
+        await run_in_threadpool(self.temp_path.unlink, True)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File too large. Maximum size is {max_bytes / (1024*1024):.1f}MB"
+    )
+
+
+async def remove_file(path: Path) -> None:
+    """Delete a file off the event loop; a missing file is not an error"""
+    await run_in_threadpool(path.unlink, True)
+
+
+async def receive_file(
+    request: Request,
+    field: str,
+    directory: Path,
+    max_bytes: int,
+    allowed_extensions: Optional[Collection[str]] = None
+) -> StreamedUpload:
+    """Stream the multipart part named `field` into a temp file in `directory`.
+
+    The file's extension is checked against `allowed_extensions` as soon as its part headers arrive.
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise _too_large(max_bytes)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data upload")
+
+    await run_in_threadpool(directory.mkdir, parents=True, exist_ok=True)
+    fd, temp_name = await run_in_threadpool(tempfile.mkstemp, dir=directory, prefix=".upload-", suffix=".part")
+    temp_file = os.fdopen(fd, "wb")
+    temp_path = Path(temp_name)
+
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "in_file": False,
+             "filename": None, "size": 0, "done": False}
+    buffer = bytearray()
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["in_file"] = False
+
+    def on_header_field(data: bytes, start: int, end: int):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        if disposition.get(b"name", b"").decode("latin-1") == field and state["filename"] is None:
+            state["in_file"] = True
+            state["filename"] = disposition.get(b"filename", b"").decode("utf-8", "replace")
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if state["in_file"]:
+            buffer.extend(data[start:end])
+            state["size"] += end - start
+
+    def on_part_end():
+        if state["in_file"]:
+            state["in_file"] = False
+            state["done"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if state["filename"] is not None and allowed_extensions is not None \
+                    and Path(state["filename"]).suffix.lower() not in allowed_extensions:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid file type. Allowed types: {', '.join(allowed_extensions)}"
+                )
+            if state["size"] > max_bytes:
+                raise _too_large(max_bytes)
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(temp_file.write, bytes(buffer))
+                buffer.clear()
+        parser.finalize()
+        if buffer:
+            await run_in_threadpool(temp_file.write, bytes(buffer))
+            buffer.clear()
+        await run_in_threadpool(temp_file.close)
+    except MultipartParseError as e:
+        await run_in_threadpool(temp_file.close)
+        await run_in_threadpool(temp_path.unlink, True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Malformed upload: {e}")
+    except BaseException:
+        await run_in_threadpool(temp_file.close)
+        await run_in_threadpool(temp_path.unlink, True)
+        raise
+
+    if not state["done"]:
+        await run_in_threadpool(temp_path.unlink, True)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"No '{field}' file in the upload")
+    return StreamedUpload(temp_path, state["filename"] or "", state["size"])
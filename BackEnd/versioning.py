@@ -0,0 +1,43 @@
+"""Per-profile version counter.
+
+Every write to a profile or one of its child rows bumps `profiles.version` and
+`profiles.updated_at` in the same transaction, so the version alone tells
+whether anything visible on the profile changed (ETags, conditional GETs).
+
+ORM writes are tracked automatically by a `before_flush` hook. Statements
+that bypass the unit of work (bulk INSERT/UPDATE/DELETE) must execute
+`bump_profile_versions()` themselves.
+"""
+from typing import Iterable
+
+from sqlalchemy import event, func, update
+from sqlalchemy.orm import Session
+
+from Models.ProfileModel import Profile
+from Models.JobModel import Job
+from Models.ProjectModel import Project
+from Models.ServiceModel import Service
+from Models.SocialLinkModel import SocialLink
+
+_CHILD_MODELS = (Job, Project, Service, SocialLink)
+
+
+def bump_profile_versions(profile_ids: Iterable[str]):
+    """UPDATE statement incrementing the version of the given profiles"""
+    return (
+        update(Profile)
+        .where(Profile.id.in_(sorted(set(profile_ids))))
+        .values(version=Profile.version + 1, updated_at=func.now())
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _bump_on_flush(session: Session, flush_context, instances):
+    # New profiles start at version 1 via the column default; deleted ones need no bump
+    profile_ids = {obj.id for obj in session.dirty if isinstance(obj, Profile) and session.is_modified(obj)}
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _CHILD_MODELS) and obj.profile_id:
+            profile_ids.add(obj.profile_id)
+    if profile_ids:
+        session.execute(bump_profile_versions(profile_ids))